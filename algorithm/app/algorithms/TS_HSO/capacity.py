@@ -0,0 +1,164 @@
+"""
+capacity.py - 各日期容量可行性檢查
+在最佳化之前比較每個 (日期, 房型) 的需求時數 (手術時間 + 0.5h 清潔) 與手術室班別容量，
+並依醫師當日班別 (DOCTOR_SCHEDULE_TYPES) 檢查只能排夜班 / 只能排早班的需求與醫師個人時數。
+手術只能排進護理人數 >= 需求的手術室，因此容量依 (房型, 護理人數) 資格類別分別比較：
+需求 >= n 人的手術時數不得超過護理人數 >= n 的手術室容量 (各門檻 n 取自當日實際的需求人數)。
+fast exit 時由 trim_overbooked 只剔除放不下的手術，其餘照常排程。
+"""
+
+from datetime import date
+from typing import Callable, Dict, List, Set, Tuple
+
+from app.models.scheduling import Surgery
+
+SHIFT_HOURS = 8.0
+CLEANUP_HOURS = 0.5
+
+
+def _shift_hours(room: Dict, shift: str) -> float:
+    return SHIFT_HOURS if room.get(f'{shift}_shift', False) else 0.0
+
+
+def doctor_available_hours(scheduler, doctor_id: str, day: date) -> float:
+    """醫師當日可手術的時數：每個可排班別 8h"""
+    return SHIFT_HOURS * len(scheduler._get_available_shifts_for_doctor(doctor_id, day))
+
+
+def _nurse_class(rooms: List[Dict], cells: Dict[int, Dict[str, float]], need: int) -> Dict:
+    """需求 >= need 人的手術與護理人數 >= need 的手術室"""
+    eligible = [r for r in rooms if r.get('nurse_count', 0) >= need]
+    morning = sum(_shift_hours(r, 'morning') for r in eligible)
+    night = sum(_shift_hours(r, 'night') for r in eligible)
+    capacity = morning + night
+    requested = sum(c['requested'] for n, c in cells.items() if n >= need)
+    night_only = sum(c['night_only'] for n, c in cells.items() if n >= need)
+    morning_only = sum(c['morning_only'] for n, c in cells.items() if n >= need)
+    return {
+        'rooms': [r['id'] for r in eligible],
+        'requested_hours': round(requested, 2),
+        'capacity_hours': capacity,
+        'night_only_hours': round(night_only, 2),
+        'night_capacity_hours': night,
+        'morning_only_hours': round(morning_only, 2),
+        'morning_capacity_hours': morning,
+        'overflow_hours': round(max(requested - capacity, 0.0), 2),
+        'overbooked': requested > capacity or night_only > night or morning_only > morning
+    }
+
+
+def capacity_report(scheduler, surgeries: List[Surgery]) -> Dict[str, Dict]:
+    """
+    回傳 {日期: {'overbooked', 'room_types', 'doctors'}}，只列出超額的醫師；
+    room_types[房型] = {'overbooked', 'by_nurse_count': {需求人數門檻: 該資格類別的需求與容量}}
+    """
+    buffer_hours = scheduler.DOCTOR_BUFFER_MINUTES / 60
+    # 日期 -> 房型 -> 護理需求人數 -> 時數
+    demand: Dict[date, Dict[str, Dict[int, Dict[str, float]]]] = {}
+    doctors: Dict[date, Dict[str, List[float]]] = {}
+
+    for s in surgeries:
+        hours = s.duration + CLEANUP_HOURS
+        shifts = scheduler._get_available_shifts_for_doctor(s.doctor_id, s.surgery_date) if s.doctor_id else None
+        cell = demand.setdefault(s.surgery_date, {}).setdefault(s.surgery_room_type, {}).setdefault(
+            s.nurse_count, {'requested': 0.0, 'morning_only': 0.0, 'night_only': 0.0}
+        )
+        cell['requested'] += hours
+        if shifts == ['night']:
+            cell['night_only'] += hours
+        elif shifts == ['morning']:
+            cell['morning_only'] += hours
+        if s.doctor_id:
+            doctors.setdefault(s.surgery_date, {}).setdefault(s.doctor_id, []).append(s.duration)
+
+    report: Dict[str, Dict] = {}
+    for d in sorted(demand):
+        room_types = {}
+        overbooked = False
+        for room_type, cells in sorted(demand[d].items()):
+            rooms = scheduler._rooms_by_type.get(room_type, [])
+            by_nurse_count = {str(need): _nurse_class(rooms, cells, need) for need in sorted(cells)}
+            over = any(c['overbooked'] for c in by_nurse_count.values())
+            overbooked |= over
+            room_types[room_type] = {'overbooked': over, 'by_nurse_count': by_nurse_count}
+
+        # 醫師：手術時數加上台與台之間的緩衝，不得超過當日可用班別時數
+        over_doctors = {}
+        for doctor_id, durations in doctors.get(d, {}).items():
+            available = doctor_available_hours(scheduler, doctor_id, d)
+            needed = sum(durations) + buffer_hours * (len(durations) - 1)
+            if needed > available:
+                over_doctors[doctor_id] = {
+                    'schedule_type': scheduler._get_doctor_schedule_type(doctor_id, d),
+                    'requested_hours': round(needed, 2),
+                    'available_hours': available
+                }
+        overbooked |= bool(over_doctors)
+
+        report[str(d)] = {'overbooked': overbooked, 'room_types': room_types, 'doctors': over_doctors}
+    return report
+
+
+def overbooked_dates(report: Dict[str, Dict]) -> Set[str]:
+    return {d for d, entry in report.items() if entry['overbooked']}
+
+
+def _trim(members: List[Surgery], capacity: float, priority: Callable[[Surgery], Tuple],
+          hours: Callable[[Surgery], float] = lambda s: s.duration + CLEANUP_HOURS) -> List[Surgery]:
+    """依優先序由低到高剔除，直到 members 的時數不超過 capacity；回傳被剔除的手術"""
+    total = sum(hours(s) for s in members)
+    dropped = []
+    for s in sorted(members, key=priority):
+        if total <= capacity + 1e-9:
+            break
+        total -= hours(s)
+        dropped.append(s)
+    return dropped
+
+
+def trim_overbooked(scheduler, surgeries: List[Surgery]) -> Tuple[List[Surgery], List[Surgery]]:
+    """
+    把超額的資格類別與超時醫師修剪到剛好放得下，回傳 (保留, 剔除)。
+    每個 (日期, 房型) 由最高的護理人數門檻往下，依序讓只能排夜班 / 只能排早班 / 全部的需求時數
+    不超過該資格類別的對應容量；再讓每位醫師的手術時數加緩衝不超過當日可用時數。
+    剔除順序為 AHP 分數由低到高 (同分時長者先)，即長手術先剔除。
+    """
+    def priority(s: Surgery) -> Tuple:
+        return scheduler._calculate_ahp_score(s), -s.duration
+
+    dropped: Set[str] = set()
+    groups: Dict[Tuple[date, str], List[Surgery]] = {}
+    for s in surgeries:
+        groups.setdefault((s.surgery_date, s.surgery_room_type), []).append(s)
+
+    for (d, room_type), members in groups.items():
+        rooms = scheduler._rooms_by_type.get(room_type, [])
+        for need in sorted({s.nurse_count for s in members}, reverse=True):
+            eligible = [r for r in rooms if r.get('nurse_count', 0) >= need]
+            cls = [s for s in members if s.nurse_count >= need and s.surgery_id not in dropped]
+            shifts = {
+                s.surgery_id: scheduler._get_available_shifts_for_doctor(s.doctor_id, d) if s.doctor_id else None
+                for s in cls
+            }
+            for only, shift in ((['night'], 'night'), (['morning'], 'morning')):
+                limited = [s for s in cls if shifts[s.surgery_id] == only]
+                capacity = sum(_shift_hours(r, shift) for r in eligible)
+                dropped.update(s.surgery_id for s in _trim(limited, capacity, priority))
+            cls = [s for s in cls if s.surgery_id not in dropped]
+            capacity = sum(_shift_hours(r, 'morning') + _shift_hours(r, 'night') for r in eligible)
+            dropped.update(s.surgery_id for s in _trim(cls, capacity, priority))
+
+    buffer_hours = scheduler.DOCTOR_BUFFER_MINUTES / 60
+    doctors: Dict[Tuple[str, date], List[Surgery]] = {}
+    for s in surgeries:
+        if s.doctor_id and s.surgery_id not in dropped:
+            doctors.setdefault((s.doctor_id, s.surgery_date), []).append(s)
+    for (doctor_id, d), members in doctors.items():
+        # n 台手術之間有 n - 1 次緩衝：每台記 手術時間 + 緩衝，可用時數也加一次緩衝
+        available = doctor_available_hours(scheduler, doctor_id, d) + buffer_hours
+        dropped.update(s.surgery_id for s in _trim(
+            members, available, priority, hours=lambda s: s.duration + buffer_hours
+        ))
+
+    kept = [s for s in surgeries if s.surgery_id not in dropped]
+    return kept, [s for s in surgeries if s.surgery_id in dropped]
@@ -0,0 +1,100 @@
+"""
+closed_loop.py - Stage 1 / Stage 2 閉環迭代
+Stage 2 之後，只把有失敗或延遲手術的 (日期, 房型) 群組送回 Stage 1 重新分配，
+並對失敗 / 延遲時所在的 (手術, 手術室) 加上懲罰；其餘群組的排程結果保持不動，
+作為重排時的既有資源占用。群組重排結果較好 (成功數多、延遲少) 才採用。
+"""
+
+from datetime import date
+from time import monotonic
+from typing import Dict, List, Set, Tuple
+
+from app.models.scheduling import Surgery, ScheduleResult
+
+# 每次在同一 (手術, 手術室) 失敗或延遲所累加的懲罰
+FAILED_PLACEMENT_PENALTY = 150.0
+
+
+def _group(surgery: Surgery) -> Tuple[date, str]:
+    return surgery.surgery_date, surgery.surgery_room_type
+
+
+def _objective(scheduler, results: List[ScheduleResult]) -> Tuple[int, int]:
+    return len(results), -sum(1 for r in results if scheduler._is_delayed(r.end_time, r.primary_shift))
+
+
+def run_closed_loop(
+    scheduler,
+    surgeries: List[Surgery],
+    allocation: Dict[str, Dict],
+    results: List[ScheduleResult],
+    failed: List[Surgery]
+):
+    """回傳 (results, failed)；統計寫入 scheduler.stats['closed_loop']"""
+    started = monotonic()
+    deadline = started + scheduler.CLOSED_LOOP_TIME_MS / 1000
+    by_id = scheduler._index_surgeries(surgeries)
+    # 重排群組時的 Stage 1 / Stage 2 統計只屬於子問題，結束後還原主流程的統計
+    main_stats = dict(scheduler.stats)
+    before = _objective(scheduler, results)
+    iterations = improved_groups = 0
+    stop_reason = 'iterations'
+
+    while iterations < scheduler.CLOSED_LOOP_ITERATIONS:
+        # 1. 找出有失敗或延遲的群組，並對當時的房間加懲罰
+        groups: Set[Tuple[date, str]] = set()
+        for s in failed:
+            groups.add(_group(s))
+            room_id = allocation.get(s.surgery_id, {}).get('room_id')
+            if room_id is not None:
+                key = (s.surgery_id, room_id)
+                scheduler._placement_penalties[key] = scheduler._placement_penalties.get(key, 0.0) + FAILED_PLACEMENT_PENALTY
+        for r in results:
+            if scheduler._is_delayed(r.end_time, r.primary_shift):
+                groups.add(_group(by_id[r.surgery_id]))
+                key = (r.surgery_id, r.room_id)
+                scheduler._placement_penalties[key] = scheduler._placement_penalties.get(key, 0.0) + FAILED_PLACEMENT_PENALTY
+        if not groups:
+            stop_reason = 'resolved'
+            break
+        if monotonic() >= deadline or scheduler._stage2_time_up():
+            stop_reason = 'time_budget'
+            break
+        iterations += 1
+
+        # 2. 逐一群組重排：固定其他群組的結果作為既有資源占用
+        for group in sorted(groups):
+            if monotonic() >= deadline or scheduler._stage2_time_up():
+                break
+            subset = [s for s in surgeries if _group(s) == group]
+            subset_ids = {s.surgery_id for s in subset}
+            kept = [r for r in results if r.surgery_id not in subset_ids]
+            resources = scheduler._new_resources()
+            for r in kept:
+                scheduler._update_resources(resources, by_id[r.surgery_id], r.room_id, r)
+
+            sub_allocation = scheduler._stage1_ga_allocation(subset)
+            sub_results, sub_failed = scheduler._stage2_greedy_scheduling(subset, sub_allocation, resources)
+
+            old_results = [r for r in results if r.surgery_id in subset_ids]
+            if _objective(scheduler, sub_results) <= _objective(scheduler, old_results):
+                continue
+            improved_groups += 1
+            results = kept + sub_results
+            failed = [s for s in failed if s.surgery_id not in subset_ids] + sub_failed
+            allocation = dict(allocation, **sub_allocation)
+
+    scheduler.stats.clear()
+    scheduler.stats.update(main_stats)
+    after = _objective(scheduler, results)
+    scheduler.stats['closed_loop'] = {
+        'iterations': iterations,
+        'improved_groups': improved_groups,
+        'scheduled_before': before[0],
+        'scheduled_after': after[0],
+        'delayed_before': -before[1],
+        'delayed_after': -after[1],
+        'stop_reason': stop_reason,
+        'elapsed_ms': round((monotonic() - started) * 1000, 1)
+    }
+    return results, failed
@@ -0,0 +1,83 @@
+"""
+diagnostics.py - Stage 2 延遲 / 失敗原因
+時段搜尋時只累加整數旗標 (SlotReason)；延遲或失敗的手術在整批排程結束後才轉成文字
+(delay_reason / failure_reason)，準時排入的手術完全不產生原因。config 'diagnostics' 為 False 時
+時段搜尋不再重播逐格檢查，失敗手術只帶固定的 NO_SLOT_TEXT。
+"""
+
+from typing import List, NamedTuple
+
+from app.models.scheduling import Surgery, ScheduleResult
+
+
+class SlotReason:
+    """時段被拒絕的原因位元；刻意用純 int 而非 enum.IntFlag (IntFlag 的 | 運算每次約 1.5us)"""
+    NONE = 0
+    AFTER_HOURS = 1 << 0
+    DOCTOR_NO_SCHEDULE = 1 << 1
+    DOCTOR_NO_MORNING = 1 << 2
+    DOCTOR_NO_NIGHT = 1 << 3
+    DOCTOR_CROSS_SHIFT = 1 << 4
+    ROOM_CONFLICT = 1 << 5
+    DOCTOR_CONFLICT = 1 << 6
+    ASSISTANT_CONFLICT = 1 << 7
+
+
+REASON_TEXT = {
+    SlotReason.AFTER_HOURS: "超過營業時間",
+    SlotReason.DOCTOR_NO_SCHEDULE: "醫師當日無排班",
+    SlotReason.DOCTOR_NO_MORNING: "醫師無morning班",
+    SlotReason.DOCTOR_NO_NIGHT: "醫師無night班",
+    SlotReason.DOCTOR_CROSS_SHIFT: "跨班但醫師缺班",
+    SlotReason.ROOM_CONFLICT: "房間時段衝突",
+    SlotReason.DOCTOR_CONFLICT: "醫師時段衝突",
+    SlotReason.ASSISTANT_CONFLICT: "助手時段衝突",
+}
+DOCTOR_REASONS = (SlotReason.DOCTOR_NO_SCHEDULE | SlotReason.DOCTOR_NO_MORNING | SlotReason.DOCTOR_NO_NIGHT
+                  | SlotReason.DOCTOR_CROSS_SHIFT | SlotReason.DOCTOR_CONFLICT)
+NO_SLOT_TEXT = "無合適時段"
+
+
+class Diagnosis(NamedTuple):
+    """seen: 找到時段 (或搜尋結束) 前被拒絕過的原因；last: 最後一次拒絕的原因；
+    no_earlier: 延遲且救援找不到更早時段"""
+    seen: int = 0
+    last: int = 0
+    no_earlier: bool = False
+
+
+NO_DIAGNOSIS = Diagnosis()
+
+
+def _texts(flags: int) -> List[str]:
+    return [text for reason, text in REASON_TEXT.items() if flags & reason]
+
+
+def delay_text(diagnosis: Diagnosis) -> str:
+    if not diagnosis.seen:
+        return "延遲但成功"
+    # 優先顯示醫師原因，因為那是不可抗力
+    if diagnosis.seen & DOCTOR_REASONS:
+        text = "醫師時段衝突/無排班"
+    elif diagnosis.seen & SlotReason.ROOM_CONFLICT:
+        text = "前方時段房間已滿"
+    else:
+        text = ",".join(_texts(diagnosis.seen)[:2])
+    return f"無更早空位(受限於: {text})" if diagnosis.no_earlier else text
+
+
+def failure_text(diagnosis: Diagnosis) -> str:
+    last = REASON_TEXT.get(diagnosis.last, NO_SLOT_TEXT)
+    if diagnosis.seen:
+        return f"{last} (曾遇: {','.join(_texts(diagnosis.seen)[:2])})"
+    return last
+
+
+def describe(results: List[ScheduleResult], failed: List[Surgery], enabled: bool = True):
+    """把最終延遲 / 失敗手術的旗標轉成 delay_reason / failure_reason"""
+    for r in results:
+        diagnosis = getattr(r, 'delay_diagnosis', None)
+        r.delay_reason = delay_text(diagnosis) if enabled and diagnosis is not None else ""
+    for s in failed:
+        diagnosis = getattr(s, 'failure_diagnosis', None)
+        s.failure_reason = failure_text(diagnosis) if enabled and diagnosis is not None else NO_SLOT_TEXT
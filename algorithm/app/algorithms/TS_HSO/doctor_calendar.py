@@ -0,0 +1,84 @@
+"""
+doctor_calendar.py - 醫師排班日曆
+建立排程器時把 doctor_schedules (每週班別代碼) 與 DOCTOR_SCHEDULE_TYPES 編譯一次，
+之後以 (醫師, 日期) 直接取得可排手術的分鐘遮罩，不再每次查週名稱與班別表。
+遮罩以當日 00:00 起的分鐘為索引，早班 [08:00, 16:00)、夜班 [16:00, 隔日 24:00)，跨班規則已套用：
+手術 [start, end] 可排若且唯若 mask[start:end + 1] 全為 True，因此只有早班的醫師必須在 16:00 前結束
+(結束於 16:00 即視為跨班)。逐分鐘的檢查另編成 reach[m] (m 所在可排區段的結束分鐘，不可排為 0)，
+allows() 只需一次串列索引。未列於 doctor_schedules 的醫師視為 A 班，未知班別代碼視為早晚班皆可。
+"""
+
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+MINUTES = 2 * 24 * 60
+SHIFT_MINUTES = {'morning': (8 * 60, 16 * 60), 'night': (16 * 60, MINUTES)}
+DEFAULT_SHIFTS = ['morning', 'night']
+DEFAULT_TYPE = 'A'
+WEEKDAYS = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')
+
+
+class _CompiledType:
+    __slots__ = ('shifts', 'mask', 'runs', 'reach', 'flags')
+
+    def __init__(self, shifts: List[str]):
+        self.shifts = list(shifts)
+        self.mask = np.zeros(MINUTES, dtype=bool)
+        for shift in self.shifts:
+            if shift in SHIFT_MINUTES:
+                lo, hi = SHIFT_MINUTES[shift]
+                self.mask[lo:hi] = True
+        self.mask.flags.writeable = False
+        edges = np.flatnonzero(np.diff(np.concatenate(([0], self.mask.view(np.int8), [0]))))
+        self.runs = list(zip(edges[::2].tolist(), edges[1::2].tolist()))
+        self.reach = [0] * MINUTES
+        for lo, hi in self.runs:
+            self.reach[lo:hi] = [hi] * (hi - lo)
+        # (可否排早班, 可否排夜班)：Stage 1 的班別判斷
+        self.flags = (bool(self.mask[SHIFT_MINUTES['morning'][0]]), bool(self.mask[SHIFT_MINUTES['night'][0]]))
+
+
+class DoctorCalendar:
+    """(醫師, 日期) → 班別代碼與可排分鐘遮罩"""
+
+    def __init__(self, doctor_schedules: Dict[str, Dict[str, str]], schedule_types: Dict[str, Dict]):
+        self._types: Dict[Optional[str], _CompiledType] = {
+            code: _CompiledType(spec.get('available_shifts', DEFAULT_SHIFTS)) for code, spec in schedule_types.items()
+        }
+        self._fallback = _CompiledType(DEFAULT_SHIFTS)
+        self._weekly: Dict[Tuple[str, int], Optional[str]] = {
+            (doctor_id, weekday): week.get(name, DEFAULT_TYPE)
+            for doctor_id, week in doctor_schedules.items()
+            for weekday, name in enumerate(WEEKDAYS)
+        }
+        self._days: Dict[Tuple[str, date], Tuple[Optional[str], _CompiledType]] = {}
+
+    def _lookup(self, doctor_id: str, day: date) -> Tuple[Optional[str], _CompiledType]:
+        key = (doctor_id, day)
+        entry = self._days.get(key)
+        if entry is None:
+            code = self._weekly.get((doctor_id, day.weekday()), DEFAULT_TYPE)
+            entry = self._days[key] = (code, self._types.get(code, self._fallback))
+        return entry
+
+    def schedule_type(self, doctor_id: str, day: date) -> Optional[str]:
+        return self._lookup(doctor_id, day)[0]
+
+    def shifts(self, doctor_id: str, day: date) -> List[str]:
+        return self._lookup(doctor_id, day)[1].shifts
+
+    def shift_flags(self, doctor_id: str, day: date) -> Tuple[bool, bool]:
+        return self._lookup(doctor_id, day)[1].flags
+
+    def mask(self, doctor_id: str, day: date) -> np.ndarray:
+        return self._lookup(doctor_id, day)[1].mask
+
+    def allows(self, doctor_id: str, day: date, start: int, end: int) -> bool:
+        """等同 mask[start:end + 1].all()"""
+        return self._lookup(doctor_id, day)[1].reach[start] > end
+
+    def start_windows(self, doctor_id: str, day: date, duration: int) -> List[Tuple[int, int]]:
+        """可開始時間區間：start 與 start + duration 落在同一段連續可排時間內"""
+        return [(lo, hi - duration) for lo, hi in self._lookup(doctor_id, day)[1].runs if hi - duration > lo]
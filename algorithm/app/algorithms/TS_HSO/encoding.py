@@ -0,0 +1,146 @@
+"""
+encoding.py - Stage 1 染色體陣列編碼
+將手術 / 手術室 / 日期映射為整數索引，讓 GA 族群以 NumPy 矩陣
+(個體 × 手術, 值為手術室索引, -1 表示未分配) 表示，取代逐代複製的 dict。
+"""
+
+from typing import List, Dict, Callable, Optional, Tuple
+import numpy as np
+
+from app.models.scheduling import Surgery
+from .fitness_cache import chromosome_key
+
+UNASSIGNED = -1
+
+
+class ProblemEncoding:
+    """單次排程請求的索引表與預先計算陣列"""
+
+    def __init__(
+        self,
+        surgeries: List[Surgery],
+        rooms: Dict[str, Dict],
+        eligible_rooms: Callable[[Surgery], List[Dict]],
+        symmetry_breaking: bool = True,
+        placement_penalties: Optional[Dict[Tuple[str, str], float]] = None
+    ):
+        """placement_penalties: (surgery_id, room_id) -> 額外放置懲罰；懲罰不同的手術室不可互換"""
+        self.surgeries = list(surgeries)
+        self.surgery_ids = [s.surgery_id for s in self.surgeries]
+        self.surgery_index = {sid: i for i, sid in enumerate(self.surgery_ids)}
+
+        self.room_ids = list(rooms.keys())
+        self.room_index = {rid: i for i, rid in enumerate(self.room_ids)}
+        self.rooms = [rooms[rid] for rid in self.room_ids]
+
+        self.dates = sorted({s.surgery_date for s in self.surgeries})
+        date_index = {d: i for i, d in enumerate(self.dates)}
+
+        self.n_surgeries = len(self.surgeries)
+        self.n_rooms = len(self.room_ids)
+        self.n_dates = len(self.dates)
+
+        # 每台手術佔用時數 (含 0.5h 清潔)
+        self.hours = np.array([s.duration + 0.5 for s in self.surgeries], dtype=float)
+        self.date_idx = np.array([date_index[s.surgery_date] for s in self.surgeries], dtype=np.int64)
+        self.nurse_need = np.array([s.nurse_count for s in self.surgeries], dtype=np.int64)
+        self.room_nurses = np.array([room.get('nurse_count', 0) for room in self.rooms], dtype=np.int64)
+
+        # (醫師, 日期) 索引，無主刀醫師者為 -1
+        doctor_days: Dict = {}
+        self.doc_day_idx = np.array([
+            doctor_days.setdefault((s.doctor_id, s.surgery_date), len(doctor_days)) if s.doctor_id else UNASSIGNED
+            for s in self.surgeries
+        ], dtype=np.int64)
+        self.n_doc_days = len(doctor_days)
+
+        # 手術室等價類別：房型、護理人數、班別與放置懲罰欄皆相同者可互換，適應度與 Stage 2 結果不變
+        penalty_columns: Dict[str, List[Tuple[str, float]]] = {}
+        for (s_id, room_id), value in (placement_penalties or {}).items():
+            if value and s_id in self.surgery_index:
+                penalty_columns.setdefault(room_id, []).append((s_id, value))
+        classes: Dict = {}
+        self.room_class = np.array([
+            classes.setdefault(
+                (room['room_type'], room.get('nurse_count', 0), bool(room.get('morning_shift')),
+                 bool(room.get('night_shift')), bool(room.get('graveyard_shift')),
+                 tuple(sorted(penalty_columns.get(room['id'], [])))),
+                len(classes)
+            )
+            for room in self.rooms
+        ], dtype=np.int64)
+        self.room_class_list = self.room_class.tolist()
+        self.n_room_classes = len(classes)
+        self.symmetry_breaking = symmetry_breaking and self.n_room_classes < self.n_rooms
+        # 依 (類別, 索引) 排序的手術室，標準形中各類別依序使用這些房間
+        self._canonical_rooms = np.argsort(self.room_class, kind='stable')
+
+        # 每台手術的候選手術室索引 (房型相符且護理人力足夠)；同 (房型, 護理人數) 的手術共用同一陣列
+        class_candidates: Dict = {}
+        self.candidates: List[np.ndarray] = []
+        for s in self.surgeries:
+            key = (s.surgery_room_type, s.nurse_count)
+            if key not in class_candidates:
+                class_candidates[key] = np.array(
+                    [self.room_index[room['id']] for room in eligible_rooms(s)], dtype=np.int64
+                )
+            self.candidates.append(class_candidates[key])
+
+    def encode(self, allocation: Dict[str, Dict]) -> np.ndarray:
+        """dict 分配 -> 染色體 (一維整數陣列)"""
+        genes = np.full(self.n_surgeries, UNASSIGNED, dtype=np.int64)
+        for s_id, alloc in allocation.items():
+            i = self.surgery_index.get(s_id)
+            r = self.room_index.get(alloc.get('room_id'))
+            if i is not None and r is not None:
+                genes[i] = r
+        return genes
+
+    def decode(self, genes: np.ndarray) -> Dict[str, Dict]:
+        """染色體 -> dict 分配 (僅在輸出 Stage 1 結果時使用)"""
+        return {
+            self.surgery_ids[i]: {'room_id': self.room_ids[r], 'suggested_shift': 'morning'}
+            for i, r in enumerate(genes.tolist())
+            if r != UNASSIGNED
+        }
+
+    def canonicalize(self, genes: np.ndarray) -> np.ndarray:
+        """
+        標準形：同一日期內，同類別手術室依「第一次被使用的手術索引」排序後，
+        依序改寫為該類別中索引最小的房間。互為房間置換的分配因此得到相同的標準形。
+        """
+        genes = np.atleast_2d(genes)
+        if not self.symmetry_breaking or genes.shape[1] == 0:
+            return genes.copy()
+        n_ind, n_surg = genes.shape
+        n_rooms, n_dates = self.n_rooms, self.n_dates
+
+        ind, s_idx = np.nonzero(genes >= 0)
+        rooms = genes[ind, s_idx]
+        dates = self.date_idx[s_idx]
+
+        # 每個 (個體, 日期, 手術室) 第一次出現的手術索引，未使用者為 n_surg
+        first = np.full(n_ind * n_dates * n_rooms, n_surg, dtype=np.int64)
+        np.minimum.at(first, (ind * n_dates + dates) * n_rooms + rooms, s_idx)
+        first = first.reshape(n_ind, n_dates, n_rooms)
+
+        # 依 (類別, 首次出現) 排序後，第 j 個位置對應標準房間 _canonical_rooms[j]
+        order = np.argsort(self.room_class * (n_surg + 1) + first, axis=2, kind='stable')
+        mapping = np.empty_like(order)
+        np.put_along_axis(mapping, order, np.broadcast_to(self._canonical_rooms, order.shape), axis=2)
+
+        canonical = genes.copy()
+        canonical[ind, s_idx] = mapping[ind, dates, rooms]
+        return canonical
+
+    def chromosome_keys(self, genes: np.ndarray) -> List[bytes]:
+        """快取 / 去重用的鍵 (啟用對稱破除時以標準形計算)"""
+        return [chromosome_key(row) for row in self.canonicalize(genes)]
+
+    def random_population(self, size: int, rng: np.random.Generator) -> np.ndarray:
+        """每台手術從候選手術室中均勻抽樣，無候選者保持未分配"""
+        population = np.full((size, self.n_surgeries), UNASSIGNED, dtype=np.int64)
+        for i, cands in enumerate(self.candidates):
+            if len(cands):
+                population[:, i] = rng.choice(cands, size=size)
+        return population
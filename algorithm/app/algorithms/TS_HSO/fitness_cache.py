@@ -0,0 +1,61 @@
+"""
+fitness_cache.py - 染色體適應度快取
+以染色體的 16 bytes 雜湊為鍵，LRU 淘汰，並統計命中率。
+"""
+
+from collections import OrderedDict
+from hashlib import blake2b
+from typing import Dict, Optional
+import numpy as np
+
+
+def chromosome_key(genes: np.ndarray) -> bytes:
+    """染色體 (一維手術室索引陣列) -> 精簡雜湊鍵"""
+    return blake2b(np.ascontiguousarray(genes, dtype=np.int32).tobytes(), digest_size=16).digest()
+
+
+class FitnessCache:
+    """有上限的 LRU 適應度快取"""
+
+    def __init__(self, maxsize: int = 4096):
+        self.maxsize = max(0, int(maxsize))
+        self._data: 'OrderedDict[bytes, float]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: bytes) -> bool:
+        return key in self._data
+
+    def get(self, key: bytes) -> Optional[float]:
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key: bytes, value: float):
+        if self.maxsize == 0:
+            return
+        if key in self._data:
+            self._data.move_to_end(key)
+        self._data[key] = float(value)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,131 @@
+"""
+island_model.py - 島嶼模型平行 GA
+N 個子族群分別在 process pool 的工作行程中演化，每 migration_interval 代
+回到主行程，以環狀拓撲把各島最佳 migration_size 個個體遷移到下一島取代最差個體。
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+import os
+import numpy as np
+
+from app.models.scheduling import Surgery
+from .fitness_cache import FitnessCache
+
+# 工作行程內的常駐內容 (排程器、編碼、快取)，由 initializer 建立一次
+_worker: Dict = {}
+
+
+def _init_worker(scheduler, surgeries: List[Surgery]):
+    _, evaluator = scheduler._build_fitness_model(surgeries)
+    _worker.update(
+        scheduler=scheduler,
+        evaluator=evaluator,
+        cache=FitnessCache(scheduler.FITNESS_CACHE_SIZE),
+    )
+
+
+def _evolve_island(genes: np.ndarray, generations: int, seed: int) -> Tuple:
+    scheduler, evaluator, cache = _worker['scheduler'], _worker['evaluator'], _worker['cache']
+    scheduler.rng = np.random.default_rng(seed)
+    hits, misses = cache.hits, cache.misses
+    # memetic 計數寫在工作行程的排程器上，每段演化重新計數後帶回主行程加總
+    scheduler.stats.pop('memetic', None)
+    state = evaluator.build_state(genes)
+    state, best_genes, best_fitness, _, reseeded = scheduler._evolve(state, evaluator, cache, generations)
+    lookups = (cache.hits - hits, cache.misses - misses)
+    memetic = scheduler.stats.pop('memetic', {})
+    return state.genes, evaluator.scores(state), best_genes, best_fitness, reseeded, lookups, memetic
+
+
+def _migrate(populations: List[np.ndarray], scores: List[np.ndarray], size: int):
+    """環狀遷移：第 k 島的前 size 名取代第 k+1 島的後 size 名"""
+    n = len(populations)
+    emigrants = [(pop[np.argsort(sc)[-size:]].copy(), np.sort(sc)[-size:]) for pop, sc in zip(populations, scores)]
+    for k in range(n):
+        genes, fit = emigrants[k]
+        target = (k + 1) % n
+        worst = np.argsort(scores[target])[:len(genes)]
+        populations[target][worst] = genes
+        scores[target][worst] = fit
+
+
+def run_island_model(scheduler, surgeries: List[Surgery], initial_genes: np.ndarray) -> Tuple[np.ndarray, float]:
+    """執行島嶼模型 GA，回傳 (最佳基因, 最佳適應度)；統計寫入 scheduler.stats"""
+    n_islands = int(scheduler.GA_ISLANDS)
+    interval = max(1, int(scheduler.MIGRATION_INTERVAL))
+    size = max(0, min(int(scheduler.MIGRATION_SIZE), scheduler.POPULATION_SIZE - 1))
+    workers = scheduler.ISLAND_WORKERS or min(n_islands, os.cpu_count() or 1)
+
+    encoding, evaluator = scheduler._build_fitness_model(surgeries)
+    populations = [encoding.random_population(scheduler.POPULATION_SIZE, scheduler.rng) for _ in range(n_islands)]
+    for pop in populations:
+        pop[0] = initial_genes
+    scores = [evaluator.evaluate(pop) for pop in populations]
+
+    best_genes = initial_genes.copy()
+    best_fitness = float(evaluator.evaluate(initial_genes)[0])
+    generations = no_improvement = migrations = reseeded = hits = misses = 0
+    memetic: Dict[str, int] = {}
+    stop_reason = 'generations'
+
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=_init_worker, initargs=(scheduler, surgeries)
+    ) as pool:
+        while generations < scheduler.GENERATIONS:
+            step = min(interval, scheduler.GENERATIONS - generations)
+            seeds = scheduler.rng.integers(0, 2**31 - 1, size=n_islands).tolist()
+            futures = [pool.submit(_evolve_island, pop, step, seed) for pop, seed in zip(populations, seeds)]
+
+            improved = False
+            for k, future in enumerate(futures):
+                genes, island_scores, island_best, island_fitness, island_reseeded, lookups, polished = future.result()
+                populations[k], scores[k] = genes, island_scores
+                reseeded += island_reseeded
+                hits, misses = hits + lookups[0], misses + lookups[1]
+                for name, count in polished.items():
+                    memetic[name] = memetic.get(name, 0) + count
+                if island_fitness > best_fitness:
+                    best_fitness, best_genes, improved = island_fitness, island_best.copy(), True
+
+            generations += step
+            no_improvement = 0 if improved else no_improvement + step
+            if scheduler._reached_upper_bound(best_fitness):
+                print(f"    ✓ 島嶼 GA 於世代 {generations} 達到適應度上界, Fitness={best_fitness:.2f}")
+                stop_reason = 'optimal'
+                break
+            if no_improvement >= scheduler._patience:
+                print(f"    ✓ 島嶼 GA 提前收斂於世代 {generations}, Fitness={best_fitness:.2f}")
+                stop_reason = 'converged'
+                break
+            if scheduler._stage1_time_up():
+                print(f"    ⏱ 島嶼 GA 時間預算用完於世代 {generations}, Fitness={best_fitness:.2f}")
+                stop_reason = 'time_budget'
+                break
+            if size and generations < scheduler.GENERATIONS:
+                _migrate(populations, scores, size)
+                migrations += 1
+
+    scheduler.stats['stage1'] = {
+        'engine': 'ga',
+        'generations': generations,
+        'best_fitness': round(best_fitness, 2),
+        'stop_reason': stop_reason
+    }
+    scheduler.stats['islands'] = {
+        'islands': n_islands,
+        'workers': workers,
+        'generations': generations,
+        'migrations': migrations,
+        'migration_interval': interval,
+        'migration_size': size,
+    }
+    scheduler.stats['fitness_cache'] = {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / (hits + misses), 4) if hits + misses else 0.0,
+        'duplicates_reseeded': reseeded,
+    }
+    if memetic:
+        scheduler.stats['memetic'] = memetic
+    return best_genes, best_fitness
@@ -0,0 +1,122 @@
+"""
+lns.py - 破壞與重建大鄰域搜尋 (Ruin-and-Recreate LNS)
+在 Stage 2 產生的完整排程上反覆移除一部分手術 (同一手術室日、同一醫師日或隨機)，
+連同當日失敗的手術一起以 Stage 2 的時段搜尋重新插入；只保留使雙階段目標改善的結果：
+成功排入數優先，其次為延遲台數，再其次為各房結束時間總和 (越緊湊越好)。
+"""
+
+from datetime import date
+from time import monotonic
+from typing import Dict, List, Set, Tuple
+
+from app.models.scheduling import Surgery, ScheduleResult
+from .diagnostics import NO_DIAGNOSIS
+from .occupancy import to_minutes
+
+RUIN_STRATEGIES = ('room', 'doctor', 'random')
+
+
+def _objective(scheduler, results: List[ScheduleResult]) -> Tuple[int, int, int]:
+    delayed = sum(1 for r in results if scheduler._is_delayed(r.end_time, r.primary_shift))
+    # 跨午夜的清潔結束時間以 >= 1440 分鐘計，否則 00:30 會比 23:30 看起來更早
+    finish = sum(to_minutes(r.cleanup_end_time, to_minutes(r.start_time)) for r in results)
+    return len(results), -delayed, -finish
+
+
+def _ruin(scheduler, results: List[ScheduleResult], failed: List[Surgery], by_id: Dict[str, Surgery]) -> Tuple[str, Set[str], Set[date]]:
+    """挑選破壞策略，回傳 (策略, 要移除的手術 ID, 受影響日期)"""
+    rng = scheduler.rng
+    strategy = RUIN_STRATEGIES[rng.integers(len(RUIN_STRATEGIES))]
+    anchor = results[rng.integers(len(results))]
+
+    if strategy == 'doctor':
+        # 優先挑失敗手術的醫師，才有機會把它排進去
+        target = failed[rng.integers(len(failed))] if failed else by_id[anchor.surgery_id]
+        removed = {r.surgery_id for r in results
+                   if by_id[r.surgery_id].doctor_id == target.doctor_id
+                   and r.scheduled_date == target.surgery_date}
+        return strategy, removed, {target.surgery_date}
+
+    if strategy == 'room':
+        removed = {r.surgery_id for r in results
+                   if r.room_id == anchor.room_id and r.scheduled_date == anchor.scheduled_date}
+    else:
+        size = min(int(scheduler.LNS_RUIN_SIZE), len(results))
+        picked = rng.choice(len(results), size=size, replace=False).tolist()
+        removed = {results[k].surgery_id for k in picked}
+    return strategy, removed, {by_id[sid].surgery_date for sid in removed}
+
+
+def _recreate(scheduler, kept: List[ScheduleResult], pending: List[Surgery], by_id: Dict[str, Surgery]):
+    """在保留的排程上依序以最早完成的可行時段重新插入 pending 手術"""
+    resources = scheduler._new_resources()
+    for r in kept:
+        scheduler._update_resources(resources, by_id[r.surgery_id], r.room_id, r)
+
+    results = list(kept)
+    failed = []
+    for s in pending:
+        best_slot, best_room, room = None, None, None
+        for room in scheduler._eligible_rooms(s):
+            slot, _ = scheduler._find_feasible_slot(s, room, resources)
+            if slot and (best_slot is None or slot['end_min'] < best_slot['end_min']):
+                best_slot, best_room = slot, room
+        # 原因只對最後回報的房間取得：失敗者取最後一間候選房，延遲者取選中的房間
+        if best_slot is None:
+            diagnosis = scheduler._find_feasible_slot(s, room, resources, diagnose=True)[1] if room else NO_DIAGNOSIS
+            failed.append((s, diagnosis))
+            continue
+        diagnosis = NO_DIAGNOSIS
+        if scheduler._is_delayed(best_slot['end'], best_slot['shift']):
+            diagnosis = scheduler._find_feasible_slot(s, best_room, resources, diagnose=True)[1]
+        res = scheduler._build_result(s, best_room, best_slot, scheduler._calculate_ahp_score(s), diagnosis)
+        results.append(res)
+        scheduler._update_resources(resources, s, best_room['id'], res)
+    return results, failed
+
+
+def run_lns(scheduler, surgeries: List[Surgery], results: List[ScheduleResult], failed: List[Surgery]):
+    """以 LNS 改善 Stage 2 結果，回傳 (results, failed)；統計寫入 scheduler.stats"""
+    started = monotonic()
+    deadline = started + scheduler.LNS_TIME_MS / 1000
+    by_id = scheduler._index_surgeries(surgeries)
+    best = _objective(scheduler, results)
+    before = best
+    iterations = accepted = 0
+    strategies = {name: 0 for name in RUIN_STRATEGIES}
+
+    while results and iterations < scheduler.LNS_ITERATIONS:
+        if monotonic() >= deadline or scheduler._stage2_time_up():
+            break
+        iterations += 1
+        strategy, removed, dates = _ruin(scheduler, results, failed, by_id)
+        kept = [r for r in results if r.surgery_id not in removed]
+        pending = [by_id[sid] for sid in removed] + [s for s in failed if s.surgery_date in dates]
+        if not pending:
+            continue
+        pending = [pending[k] for k in scheduler.rng.permutation(len(pending)).tolist()]
+
+        new_results, new_failed = _recreate(scheduler, kept, pending, by_id)
+        objective = _objective(scheduler, new_results)
+        if objective <= best:
+            continue
+
+        best = objective
+        accepted += 1
+        strategies[strategy] += 1
+        for s, diagnosis in new_failed:
+            s.failure_diagnosis = diagnosis
+        failed = [s for s in failed if s.surgery_date not in dates] + [s for s, _ in new_failed]
+        results = new_results
+
+    scheduler.stats['lns'] = {
+        'iterations': iterations,
+        'accepted': accepted,
+        'accepted_by_strategy': strategies,
+        'scheduled_before': before[0],
+        'scheduled_after': best[0],
+        'delayed_before': -before[1],
+        'delayed_after': -best[1],
+        'elapsed_ms': round((monotonic() - started) * 1000, 1)
+    }
+    return results, failed
@@ -0,0 +1,102 @@
+"""
+local_search.py - Stage 1 鄰域移動與區域搜尋
+提供「單台手術換房 (relocate)」與「同日兩台手術互換房間 (swap)」兩種移動，
+皆以 PopulationFitness 的增量計算評分，供禁忌搜尋與 GA 的 memetic 精修共用。
+"""
+
+from typing import Dict, List, Tuple
+import numpy as np
+
+from .encoding import ProblemEncoding, UNASSIGNED
+from .population_fitness import PopulationFitness, PopulationState
+
+IMPROVEMENT_EPS = 1e-9
+
+
+class Neighbourhood:
+    """可移動的手術、各手術候選房間集合，以及同日手術清單"""
+
+    def __init__(self, encoding: ProblemEncoding):
+        self.encoding = encoding
+        self.movable = [s for s, cands in enumerate(encoding.candidates) if len(cands)]
+        sets = {id(c): set(c.tolist()) for c in encoding.candidates}
+        self.candidate_sets = [sets[id(c)] for c in encoding.candidates]
+        self.by_date: Dict[int, List[int]] = {}
+        for s in self.movable:
+            self.by_date.setdefault(int(encoding.date_idx[s]), []).append(s)
+
+    def swap_partner(self, genes: np.ndarray, a: int, rng: np.random.Generator) -> int:
+        """隨機挑一台同日手術，雙方可進入對方房間時回傳其索引，否則回傳 -1"""
+        same_day = self.by_date[int(self.encoding.date_idx[a])]
+        b = same_day[rng.integers(len(same_day))]
+        room_a, room_b = int(genes[a]), int(genes[b])
+        if (room_a == UNASSIGNED or room_b == UNASSIGNED or room_a == room_b
+                or room_b not in self.candidate_sets[a] or room_a not in self.candidate_sets[b]):
+            return UNASSIGNED
+        return b
+
+
+def swap_delta(evaluator: PopulationFitness, state: PopulationState, i: int, a: int, b: int) -> float:
+    """個體 i 互換手術 a、b 的房間後未截斷分數的變化量 (暫時套用後還原)"""
+    room_a, room_b = int(state.genes[i, a]), int(state.genes[i, b])
+    delta = evaluator.move_delta(state, i, a, room_b)
+    evaluator.apply_move(state, i, a, room_b)
+    delta += evaluator.move_delta(state, i, b, room_a)
+    evaluator.apply_move(state, i, a, room_a)
+    return delta
+
+
+def first_improvement(
+    evaluator: PopulationFitness,
+    state: PopulationState,
+    i: int,
+    neighbourhood: Neighbourhood,
+    rng: np.random.Generator,
+    max_evaluations: int,
+    swap_rate: float
+) -> Tuple[float, int]:
+    """
+    對個體 i 做 first-improvement 區域搜尋：依隨機順序掃描手術，套用第一個
+    使分數上升的移動，直到一整輪沒有改善或評估次數用完；回傳 (分數增量, 評估次數)
+    """
+    genes = state.genes[i]
+    candidates = neighbourhood.encoding.candidates
+    gain = 0.0
+    evaluations = 0
+
+    while evaluations < max_evaluations:
+        improved = False
+        for a in rng.permutation(neighbourhood.movable).tolist():
+            if evaluations >= max_evaluations:
+                break
+            if rng.random() < swap_rate:
+                b = neighbourhood.swap_partner(genes, a, rng)
+                if b == UNASSIGNED:
+                    continue
+                delta = swap_delta(evaluator, state, i, a, b)
+                evaluations += 1
+                if delta > IMPROVEMENT_EPS:
+                    room_a, room_b = int(genes[a]), int(genes[b])
+                    evaluator.apply_move(state, i, a, room_b)
+                    evaluator.apply_move(state, i, b, room_a)
+                    gain += delta
+                    improved = True
+                continue
+
+            current = int(genes[a])
+            for room in candidates[a].tolist():
+                if room == current:
+                    continue
+                delta = evaluator.move_delta(state, i, a, room)
+                evaluations += 1
+                if delta > IMPROVEMENT_EPS:
+                    evaluator.apply_move(state, i, a, room)
+                    gain += delta
+                    improved = True
+                    break
+                if evaluations >= max_evaluations:
+                    break
+        if not improved:
+            break
+
+    return gain, evaluations
@@ -0,0 +1,147 @@
+"""
+occupancy.py - Stage 2 的分鐘級資源占用表
+每個 (資源, 日期) 維護一個 IntervalIndex：排序且互不重疊的占用區段 [start, end)，
+分鐘數自當日 00:00 起算，跨午夜的夜班手術以 >= 1440 的分鐘數表示。
+醫師 / 助手的前後緩衝在登記時就擴張進區段，衝突檢查與插入都以 bisect 完成 (O(log n))；
+時段搜尋則把各資源的占用轉成「可開始時間」的排序區間列表，取交集後直接跳到最早的對齊時段。
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import date, time
+from typing import Dict, List, Optional, Tuple
+
+from app.models.scheduling import Surgery, ScheduleResult
+from .diagnostics import SlotReason
+
+Intervals = List[Tuple[int, int]]
+
+# Stage 2 最早的開始時間 (08:00)；早於此的時間視為跨午夜的隔天時刻
+DAY_START_MINUTES = 8 * 60
+
+def to_minutes(t: time, not_before: int = DAY_START_MINUTES) -> int:
+    """time 轉為當日分鐘數；早於 not_before 者視為已跨過午夜"""
+    m = t.hour * 60 + t.minute
+    return m + 24 * 60 if m < not_before else m
+
+
+def to_time(minutes: int) -> time:
+    return time(minutes // 60 % 24, minutes % 60)
+
+
+class IntervalIndex:
+    """單一資源單日的占用區段；相接或重疊的區段在插入時合併"""
+
+    __slots__ = ('starts', 'ends')
+
+    def __init__(self):
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+
+    def add(self, start: int, end: int):
+        if end <= start:
+            return
+        i = bisect_left(self.ends, start)
+        j = bisect_right(self.starts, end)
+        if i < j:
+            start, end = min(start, self.starts[i]), max(end, self.ends[j - 1])
+        self.starts[i:j] = [start]
+        self.ends[i:j] = [end]
+
+    def overlaps(self, start: int, end: int) -> bool:
+        """[start, end) 是否與任何占用區段重疊"""
+        if end <= start:
+            return False
+        i = bisect_right(self.ends, start)
+        return i < len(self.starts) and self.starts[i] < end
+
+    def intervals(self) -> Intervals:
+        return list(zip(self.starts, self.ends))
+
+
+def feasible_starts(busy: Intervals, length: int, lo: int, hi: int) -> Intervals:
+    """[lo, hi) 中使 [s, s + length) 不碰到任何占用區段的開始時間 s (busy 需已排序且不重疊)"""
+    if length <= 0:
+        return [(lo, hi)]
+    out = []
+    start = lo
+    for busy_start, busy_end in busy:
+        stop = min(busy_start - length + 1, hi)
+        if stop > start:
+            out.append((start, stop))
+        start = max(start, busy_end)
+        if start >= hi:
+            return out
+    if hi > start:
+        out.append((start, hi))
+    return out
+
+
+def intersect(a: Intervals, b: Intervals) -> Intervals:
+    out = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        lo, hi = max(a[i][0], b[j][0]), min(a[i][1], b[j][1])
+        if lo < hi:
+            out.append((lo, hi))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return out
+
+
+def first_aligned(intervals: Intervals, step: int, origin: int = DAY_START_MINUTES) -> Optional[int]:
+    """區間列表中第一個落在 origin + k * step 上的時間點"""
+    for lo, hi in intervals:
+        start = lo + (origin - lo) % step
+        if start < hi:
+            return start
+    return None
+
+
+class Occupancy:
+    """房間 / 醫師 / 助手的占用區段；鍵為 (種類, 資源 ID, 日期)"""
+
+    def __init__(self, buffer_minutes: int):
+        self.buffer = int(buffer_minutes)
+        self._busy: Dict[Tuple[str, str, date], IntervalIndex] = {}
+
+    def _mark(self, kind: str, resource_id: str, day: date, start: int, end: int):
+        key = (kind, resource_id, day)
+        index = self._busy.get(key)
+        if index is None:
+            index = self._busy[key] = IntervalIndex()
+        index.add(start, end)
+
+    def _overlaps(self, kind: str, resource_id: Optional[str], day: date, start: int, end: int) -> bool:
+        index = self._busy.get((kind, resource_id, day)) if resource_id else None
+        return index is not None and index.overlaps(start, end)
+
+    def busy_intervals(self, kind: str, resource_id: Optional[str], day: date) -> Intervals:
+        index = self._busy.get((kind, resource_id, day)) if resource_id else None
+        return index.intervals() if index is not None else []
+
+    def book(self, surgery: Surgery, room_id: str, start: int, end: int, cleanup: int):
+        """登記一台手術：房間占用到清潔結束，醫師 / 助手占用前後各加緩衝"""
+        day = surgery.surgery_date
+        self._mark('room', room_id, day, start, cleanup)
+        if surgery.doctor_id:
+            self._mark('doctor', surgery.doctor_id, day, start - self.buffer, end + self.buffer)
+        if surgery.assistant_doctor_id:
+            self._mark('assistant', surgery.assistant_doctor_id, day, start - self.buffer, end + self.buffer)
+
+    def book_result(self, surgery: Surgery, room_id: str, res: ScheduleResult):
+        start = to_minutes(res.start_time)
+        end = to_minutes(res.end_time, start)
+        self.book(surgery, room_id, start, end, to_minutes(res.cleanup_end_time, end))
+
+    def conflict(self, surgery: Surgery, room_id: str, start: int, end: int, cleanup: int) -> int:
+        """回傳衝突原因 (依房間、醫師、助手的順序)，無衝突回傳 SlotReason.NONE"""
+        day = surgery.surgery_date
+        if self._overlaps('room', room_id, day, start, cleanup):
+            return SlotReason.ROOM_CONFLICT
+        if self._overlaps('doctor', surgery.doctor_id, day, start, end):
+            return SlotReason.DOCTOR_CONFLICT
+        if self._overlaps('assistant', surgery.assistant_doctor_id, day, start, end):
+            return SlotReason.ASSISTANT_CONFLICT
+        return SlotReason.NONE
@@ -0,0 +1,424 @@
+"""
+population_fitness.py - Stage 1 整批族群適應度
+一次計算整個族群 (個體 × 手術 矩陣) 的分數，與
+StandaloneScheduler._calculate_fitness 的逐一計算結果相同 (另加醫師班別懲罰，未提供時為 0；
+唯一的差異見 HOURS_DECIMALS)：
+(個體, 手術室, 日期) 時數以 bincount 累加，醫師跨房以 (醫師-日期, 手術室) 計數。
+
+每個個體同時攜帶各項中間量 (PopulationState)，單一手術換房時
+只更新受影響的兩個 (手術室, 日期) 格與一個醫師-日期，成本 O(1)。
+整列重算時先查 FitnessCache，命中者只記分數，中間量延後到需要增量更新時才建立。
+"""
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+from .encoding import ProblemEncoding, UNASSIGNED
+from .fitness_cache import FitnessCache
+
+# 評分參數 (與 _calculate_fitness 一致)
+ALLOCATED_WEIGHT = 1000.0
+OVER_LIMIT_PENALTY = 500.0
+SHORT_DAY_HOURS = 3.0
+SHORT_DAY_PENALTY = 50.0
+PACKING_MIN_HOURS = 6.0
+PACKING_MAX_HOURS = 7.8
+PACKING_BONUS = 60.0
+LONG_DAY_HOURS = 8.5
+LONG_DAY_PENALTY = 50.0
+DOCTOR_CROSS_ROOM_PENALTY = 200.0
+NURSE_WASTE_WEIGHT = 2.0
+# 醫師班別：放進沒有醫師可用班別的手術室，或單一班別的手術在同房同日超過一個班的時數
+UNAVAILABLE_ROOM_PENALTY = 300.0
+SHIFT_HOURS = 8.0
+SHIFT_OVERFLOW_PENALTY = 500.0
+MORNING_ONLY, NIGHT_ONLY = 0, 1
+
+# 時數累加後取到 1e-9，避免增減量反覆抵銷後留下浮點殘差 (例如 0 變成 1e-16)。
+# 行為差異：浮點加總恰好跨過門檻的時數 (3 × 2.6h = 7.800000000000001) 在此視為 7.8 並給 packing 加分，
+# 參考實作 _calculate_fitness 維持原本的浮點加總 (不給)；時數皆為 0.5h 倍數時兩者相同
+HOURS_DECIMALS = 9
+
+
+@dataclass
+class PopulationState:
+    """族群基因與其適應度中間量 (第 0 軸皆為個體)"""
+    genes: np.ndarray          # (P, S) 手術室索引
+    room_hours: np.ndarray     # (P, R, D) 手術室-日期 時數
+    doc_rooms: np.ndarray      # (P, DD, R) 醫師-日期 在各手術室的手術數 (multiset)
+    doc_distinct: np.ndarray   # (P, DD) 醫師-日期 使用的相異手術室數
+    allocated: np.ndarray      # (P,) 已分配手術數
+    room_score: np.ndarray     # (P,) 手術室-日期 加減分總和
+    doctor_extra: np.ndarray   # (P,) 醫師額外使用的手術室數總和
+    nurse_waste: np.ndarray    # (P,) 護理人力浪費 (人 × 小時)
+    shift_hours: np.ndarray    # (P, 2, R, D) 只能排早班 / 夜班的手術在各手術室-日期的時數
+    availability: np.ndarray   # (P,) 醫師班別懲罰總和
+    stale: np.ndarray          # (P,) 中間量尚未建立 (分數取自快取)
+    cached_raw: np.ndarray     # (P,) stale 個體的未截斷分數
+
+    def __len__(self) -> int:
+        return len(self.genes)
+
+    def take(self, rows) -> 'PopulationState':
+        """依列索引複製個體 (選擇 / 菁英保留)"""
+        return PopulationState(*(getattr(self, f)[rows].copy() for f in _STATE_FIELDS))
+
+    def assign(self, rows, other: 'PopulationState'):
+        for f in _STATE_FIELDS:
+            getattr(self, f)[rows] = getattr(other, f)
+
+    @staticmethod
+    def concat(states: Sequence['PopulationState']) -> 'PopulationState':
+        return PopulationState(*(np.concatenate([getattr(s, f) for s in states]) for f in _STATE_FIELDS))
+
+
+_STATE_FIELDS = (
+    'genes', 'room_hours', 'doc_rooms', 'doc_distinct',
+    'allocated', 'room_score', 'doctor_extra', 'nurse_waste', 'shift_hours', 'availability', 'stale', 'cached_raw'
+)
+
+
+class PopulationFitness:
+    """以預先計算陣列評估整個族群"""
+
+    def __init__(
+        self,
+        encoding: ProblemEncoding,
+        room_max_hours: np.ndarray,
+        doctor_shifts: Optional[np.ndarray] = None,
+        placement_penalty: Optional[np.ndarray] = None
+    ):
+        """
+        doctor_shifts: (S, 2) 主刀醫師當日可用 (早班, 夜班)；None 表示不考慮醫師班別
+        placement_penalty: (S, R) 額外的放置懲罰 (閉環迭代中前次失敗 / 延遲的房間)
+        """
+        self.encoding = encoding
+        self.room_max_hours = np.asarray(room_max_hours, dtype=float)
+
+        # 手術 s 放在手術室 r 的護理人力浪費 (人 × 小時)
+        surplus = encoding.room_nurses[None, :] - encoding.nurse_need[:, None]
+        self.nurse_waste = np.where(surplus > 0, surplus, 0) * encoding.hours[:, None]
+
+        # 醫師班別：與手術室開放班別無交集的放置直接扣分；只有單一班別者記入該班時數
+        room_shifts = np.array(
+            [[bool(room.get('morning_shift')), bool(room.get('night_shift'))] for room in encoding.rooms], dtype=bool
+        ).reshape(encoding.n_rooms, 2)
+        if doctor_shifts is None:
+            doctor_shifts = np.ones((encoding.n_surgeries, 2), dtype=bool)
+        doctor_shifts = np.asarray(doctor_shifts, dtype=bool).reshape(encoding.n_surgeries, 2)
+        reachable = (doctor_shifts[:, None, :] & room_shifts[None, :, :]).any(axis=2)
+        self.placement_penalty = np.where(reachable, 0.0, UNAVAILABLE_ROOM_PENALTY)
+        if placement_penalty is not None:
+            self.placement_penalty = self.placement_penalty + placement_penalty
+        self.shift_only = np.select(
+            [doctor_shifts[:, 0] & ~doctor_shifts[:, 1], doctor_shifts[:, 1] & ~doctor_shifts[:, 0]],
+            [MORNING_ONLY, NIGHT_ONLY], default=UNASSIGNED
+        ).astype(np.int64)
+
+        # 增量更新走純 Python 純量運算，預先轉為 list 避免 NumPy 純量開銷
+        self._limits = self.room_max_hours.tolist()
+        self._hours = encoding.hours.tolist()
+        self._date_idx = encoding.date_idx.tolist()
+        self._doc_day_idx = encoding.doc_day_idx.tolist()
+        self._waste = self.nurse_waste.tolist()
+        self._placement = self.placement_penalty.tolist()
+        self._shift_only = self.shift_only.tolist()
+
+    # ---------- 整批計算 ----------
+
+    def room_terms(self, room_hours: np.ndarray) -> np.ndarray:
+        """(..., 手術室, 日期) 時數 -> 每格的加分減分 (超時懲罰以負值表示)"""
+        limit = self.room_max_hours[:, None]
+        over = np.maximum(room_hours - limit, 0.0)
+        score = np.where((room_hours > 0) & (room_hours < SHORT_DAY_HOURS), -SHORT_DAY_PENALTY, 0.0)
+        score = score + np.where(
+            (room_hours >= PACKING_MIN_HOURS) & (room_hours <= PACKING_MAX_HOURS), PACKING_BONUS, 0.0
+        )
+        score = score - np.where(room_hours > LONG_DAY_HOURS, (room_hours - LONG_DAY_HOURS) * LONG_DAY_PENALTY, 0.0)
+        return score - over * OVER_LIMIT_PENALTY
+
+    def build_state(self, genes: np.ndarray) -> PopulationState:
+        """由基因矩陣從頭計算所有中間量"""
+        enc = self.encoding
+        genes = np.array(np.atleast_2d(genes), dtype=np.int64)
+        n_ind = len(genes)
+        n_rooms, n_dates, n_doc_days = enc.n_rooms, enc.n_dates, enc.n_doc_days
+
+        assigned = genes >= 0
+        ind, s_idx = np.nonzero(assigned)
+        rooms = genes[ind, s_idx]
+
+        # 1. 手術室-日期 時數
+        keys = (ind * n_rooms + rooms) * n_dates + enc.date_idx[s_idx]
+        room_hours = np.round(np.bincount(
+            keys, weights=enc.hours[s_idx], minlength=n_ind * n_rooms * n_dates
+        ), HOURS_DECIMALS).reshape(n_ind, n_rooms, n_dates)
+
+        # 2. 醫師-日期 × 手術室 計數
+        has_doc = enc.doc_day_idx[s_idx] >= 0
+        doc_keys = (ind[has_doc] * n_doc_days + enc.doc_day_idx[s_idx[has_doc]]) * n_rooms + rooms[has_doc]
+        doc_rooms = np.bincount(
+            doc_keys, minlength=n_ind * n_doc_days * n_rooms
+        ).astype(np.int32).reshape(n_ind, n_doc_days, n_rooms)
+        doc_distinct = (doc_rooms > 0).sum(axis=2).astype(np.int32)
+
+        # 3. 只能排單一班別的手術時數 (個體, 班別, 手術室, 日期)
+        shift = self.shift_only[s_idx]
+        limited = shift >= 0
+        shift_keys = (
+            ((ind[limited] * 2 + shift[limited]) * n_rooms + rooms[limited]) * n_dates + enc.date_idx[s_idx[limited]]
+        )
+        shift_hours = np.round(np.bincount(
+            shift_keys, weights=enc.hours[s_idx[limited]], minlength=n_ind * 2 * n_rooms * n_dates
+        ), HOURS_DECIMALS).reshape(n_ind, 2, n_rooms, n_dates)
+        availability = (
+            np.bincount(ind, weights=self.placement_penalty[s_idx, rooms], minlength=n_ind)
+            + np.maximum(shift_hours - SHIFT_HOURS, 0.0).sum(axis=(1, 2, 3)) * SHIFT_OVERFLOW_PENALTY
+        )
+
+        return PopulationState(
+            genes=genes,
+            room_hours=room_hours,
+            doc_rooms=doc_rooms,
+            doc_distinct=doc_distinct,
+            allocated=assigned.sum(axis=1),
+            room_score=self.room_terms(room_hours).sum(axis=(1, 2)),
+            doctor_extra=np.maximum(doc_distinct - 1, 0).sum(axis=1),
+            nurse_waste=np.bincount(ind, weights=self.nurse_waste[s_idx, rooms], minlength=n_ind),
+            shift_hours=shift_hours,
+            availability=availability,
+            stale=np.zeros(n_ind, dtype=bool),
+            cached_raw=np.zeros(n_ind),
+        )
+
+    def refresh(self, state: PopulationState, rows: np.ndarray, cache: Optional[FitnessCache] = None):
+        """變動過多的個體整批重算；快取命中者只記分數並標記為 stale"""
+        rows = np.asarray(rows, dtype=np.int64)
+        if cache is not None and len(rows):
+            keys = self.encoding.chromosome_keys(state.genes[rows])
+            cached = [cache.get(k) for k in keys]
+            hit = np.array([v is not None for v in cached], dtype=bool)
+            state.stale[rows[hit]] = True
+            state.cached_raw[rows[hit]] = [v for v in cached if v is not None]
+            rows, keys = rows[~hit], [k for k, h in zip(keys, hit) if not h]
+        if not len(rows):
+            return
+        fresh = self.build_state(state.genes[rows])
+        state.assign(rows, fresh)
+        if cache is not None:
+            for k, v in zip(keys, self.raw_scores(fresh).tolist()):
+                cache.put(k, v)
+
+    def materialize(self, state: PopulationState, i: int):
+        """為 stale 個體補建中間量 (第一次增量更新前)"""
+        if state.stale[i]:
+            state.assign([i], self.build_state(state.genes[i:i + 1]))
+
+    def raw_scores(self, state: PopulationState) -> np.ndarray:
+        n_surg = self.encoding.n_surgeries
+        if n_surg == 0:
+            return np.zeros(len(state))
+        raw = (
+            state.allocated / n_surg * ALLOCATED_WEIGHT
+            + state.room_score
+            - state.doctor_extra * DOCTOR_CROSS_ROOM_PENALTY
+            - state.nurse_waste * NURSE_WASTE_WEIGHT
+            - state.availability
+        )
+        return np.where(state.stale, state.cached_raw, raw)
+
+    def scores(self, state: PopulationState) -> np.ndarray:
+        return np.maximum(self.raw_scores(state), 0.0)
+
+    def evaluate(self, genes: np.ndarray, cache: Optional[FitnessCache] = None) -> np.ndarray:
+        """genes: (個體數, 手術數) 手術室索引矩陣 -> 每個個體的適應度"""
+        genes = np.atleast_2d(genes)
+        if cache is None:
+            return self.scores(self.build_state(genes))
+        keys = self.encoding.chromosome_keys(genes)
+        raw = np.array([cache.get(k) for k in keys], dtype=float)
+        missing = np.flatnonzero(np.isnan(raw))
+        if len(missing):
+            raw[missing] = self.raw_scores(self.build_state(genes[missing]))
+            for i in missing.tolist():
+                cache.put(keys[i], raw[i])
+        return np.maximum(raw, 0.0)
+
+    # ---------- 界限 ----------
+
+    def _type_groups(self):
+        """(日期索引, 房型) -> 該組手術索引；以及房型 -> 手術室索引"""
+        enc = self.encoding
+        rooms_of_type: Dict[str, List[int]] = {}
+        for r, room in enumerate(enc.rooms):
+            rooms_of_type.setdefault(room['room_type'], []).append(r)
+        groups: Dict[Tuple[int, str], List[int]] = {}
+        for i, s in enumerate(enc.surgeries):
+            groups.setdefault((int(enc.date_idx[i]), s.surgery_room_type), []).append(i)
+        return groups, rooms_of_type
+
+    def min_room_counts(self) -> Dict[int, int]:
+        """
+        每個日期至少需開啟的手術室數：各房型 ceil(總時數 / 該房型最大容量) 的總和
+        (bin-packing 連續鬆弛下界，時數含 0.5h 清潔)
+        """
+        groups, rooms_of_type = self._type_groups()
+        min_rooms: Dict[int, int] = {}
+        for (d, room_type), members in groups.items():
+            rooms = rooms_of_type.get(room_type)
+            capacity = max((self.room_max_hours[r] for r in rooms), default=0.0) if rooms else 0.0
+            if capacity <= 0:
+                continue
+            need = int(np.ceil(round(self.encoding.hours[members].sum() / capacity, HOURS_DECIMALS)))
+            min_rooms[d] = min_rooms.get(d, 0) + min(need, len(rooms))
+        return min_rooms
+
+    @staticmethod
+    def _doctor_split_cost(hours: float, capacity: float) -> float:
+        """
+        醫師當日 hours 小時的手術至少要付出的代價：分進 j 間手術室 (跨房 j - 1 次)，
+        放不下的部分 (hours - j × capacity) 一定造成同樣時數的超時；取所有 j 中最便宜者
+        """
+        if capacity <= 0:
+            return 0.0
+        need = max(int(np.ceil(round(hours / capacity, HOURS_DECIMALS))), 1)
+        return min(
+            (j - 1) * DOCTOR_CROSS_ROOM_PENALTY + max(round(hours - j * capacity, HOURS_DECIMALS), 0.0) * OVER_LIMIT_PENALTY
+            for j in range(1, need + 1)
+        )
+
+    def upper_bound(self) -> float:
+        """
+        適應度上界：所有可分配手術皆分配、每組 (日期, 房型) 拿到最多
+        min(floor(總時數 / 6.0), 房間數) 個 packing 加分 (總時數不足 3h 則扣一次短工時)、無超時懲罰、
+        醫師時數超過單間容量時只付跨房與超時兩者中較便宜的代價、
+        每台手術都放在護理人力浪費 + 班別懲罰最小的候選手術室
+        """
+        enc = self.encoding
+        if enc.n_surgeries == 0:
+            return 0.0
+        groups, rooms_of_type = self._type_groups()
+        bound = 0.0
+        for (d, room_type), members in groups.items():
+            members = [i for i in members if len(enc.candidates[i])]
+            if not members:
+                continue
+            bound += len(members) / enc.n_surgeries * ALLOCATED_WEIGHT
+            total = round(float(enc.hours[members].sum()), HOURS_DECIMALS)
+            bound += min(int(total // PACKING_MIN_HOURS), len(rooms_of_type[room_type])) * PACKING_BONUS
+            if total < SHORT_DAY_HOURS:
+                # 該組總時數不足 3h，無論怎麼分都至少有一間短工時
+                bound -= SHORT_DAY_PENALTY
+            bound -= sum(
+                float((self.nurse_waste[i, enc.candidates[i]] * NURSE_WASTE_WEIGHT
+                       + self.placement_penalty[i, enc.candidates[i]]).min())
+                for i in members
+            )
+        # 同一醫師當日時數超過單間手術室容量時，不是跨房就是超時
+        doctor_hours: Dict[int, float] = {}
+        doctor_capacity: Dict[int, float] = {}
+        for i in range(enc.n_surgeries):
+            dd = int(enc.doc_day_idx[i])
+            if dd < 0 or not len(enc.candidates[i]):
+                continue
+            doctor_hours[dd] = doctor_hours.get(dd, 0.0) + float(enc.hours[i])
+            capacity = max(self.room_max_hours[r] for r in enc.candidates[i].tolist())
+            doctor_capacity[dd] = max(doctor_capacity.get(dd, 0.0), capacity)
+        for dd, hours in doctor_hours.items():
+            bound -= self._doctor_split_cost(hours, doctor_capacity[dd])
+        return max(bound, 0.0)
+
+    # ---------- 增量計算 ----------
+
+    def _cell_term(self, hours: float, limit: float) -> float:
+        score = 0.0
+        if 0 < hours < SHORT_DAY_HOURS: score -= SHORT_DAY_PENALTY
+        elif PACKING_MIN_HOURS <= hours <= PACKING_MAX_HOURS: score += PACKING_BONUS
+        elif hours > LONG_DAY_HOURS: score -= (hours - LONG_DAY_HOURS) * LONG_DAY_PENALTY
+        if hours > limit: score -= (hours - limit) * OVER_LIMIT_PENALTY
+        return score
+
+    @staticmethod
+    def _shift_overflow(hours: float) -> float:
+        return max(hours - SHIFT_HOURS, 0.0) * SHIFT_OVERFLOW_PENALTY
+
+    def move_delta(self, state: PopulationState, i: int, s: int, new_room: int) -> float:
+        """個體 i 的手術 s 改放 new_room 時，未截斷分數的變化量 (不修改 state)"""
+        old_room = int(state.genes[i, s])
+        if old_room == new_room:
+            return 0.0
+        self.materialize(state, i)
+        h, d, dd = self._hours[s], self._date_idx[s], self._doc_day_idx[s]
+        k = self._shift_only[s]
+        delta = 0.0
+        extra = 0
+
+        if old_room != UNASSIGNED:
+            cell = float(state.room_hours[i, old_room, d])
+            limit = self._limits[old_room]
+            delta += self._cell_term(round(cell - h, HOURS_DECIMALS), limit) - self._cell_term(cell, limit)
+            delta += self._waste[s][old_room] * NURSE_WASTE_WEIGHT + self._placement[s][old_room]
+            if k != UNASSIGNED:
+                cell = float(state.shift_hours[i, k, old_room, d])
+                delta += self._shift_overflow(cell) - self._shift_overflow(round(cell - h, HOURS_DECIMALS))
+            if dd != UNASSIGNED and state.doc_rooms[i, dd, old_room] == 1:
+                extra -= 1
+        else:
+            delta += ALLOCATED_WEIGHT / self.encoding.n_surgeries
+
+        if new_room != UNASSIGNED:
+            cell = float(state.room_hours[i, new_room, d])
+            limit = self._limits[new_room]
+            delta += self._cell_term(round(cell + h, HOURS_DECIMALS), limit) - self._cell_term(cell, limit)
+            delta -= self._waste[s][new_room] * NURSE_WASTE_WEIGHT + self._placement[s][new_room]
+            if k != UNASSIGNED:
+                cell = float(state.shift_hours[i, k, new_room, d])
+                delta -= self._shift_overflow(round(cell + h, HOURS_DECIMALS)) - self._shift_overflow(cell)
+            if dd != UNASSIGNED and state.doc_rooms[i, dd, new_room] == 0:
+                extra += 1
+        else:
+            delta -= ALLOCATED_WEIGHT / self.encoding.n_surgeries
+
+        if extra and dd != UNASSIGNED:
+            distinct = int(state.doc_distinct[i, dd])
+            extra = max(distinct + extra - 1, 0) - max(distinct - 1, 0)
+            delta -= extra * DOCTOR_CROSS_ROOM_PENALTY
+        return delta
+
+    def apply_move(self, state: PopulationState, i: int, s: int, new_room: int):
+        """就地把個體 i 的手術 s 改放 new_room，只更新受影響的項目"""
+        old_room = int(state.genes[i, s])
+        if old_room == new_room:
+            return
+        self.materialize(state, i)
+        h, d, dd = self._hours[s], self._date_idx[s], self._doc_day_idx[s]
+        k = self._shift_only[s]
+
+        for room, sign in ((old_room, -1), (new_room, 1)):
+            if room == UNASSIGNED:
+                continue
+            cell = float(state.room_hours[i, room, d])
+            new_cell = round(cell + sign * h, HOURS_DECIMALS)
+            limit = self._limits[room]
+            state.room_hours[i, room, d] = new_cell
+            state.room_score[i] += self._cell_term(new_cell, limit) - self._cell_term(cell, limit)
+            state.nurse_waste[i] += sign * self._waste[s][room]
+            state.availability[i] += sign * self._placement[s][room]
+            state.allocated[i] += sign
+
+            if k != UNASSIGNED:
+                cell = float(state.shift_hours[i, k, room, d])
+                new_cell = round(cell + sign * h, HOURS_DECIMALS)
+                state.shift_hours[i, k, room, d] = new_cell
+                state.availability[i] += self._shift_overflow(new_cell) - self._shift_overflow(cell)
+
+            if dd != UNASSIGNED:
+                count = state.doc_rooms[i, dd, room] + sign
+                state.doc_rooms[i, dd, room] = count
+                if (sign > 0 and count == 1) or (sign < 0 and count == 0):
+                    distinct = int(state.doc_distinct[i, dd])
+                    state.doc_distinct[i, dd] = distinct + sign
+                    state.doctor_extra[i] += max(distinct + sign - 1, 0) - max(distinct - 1, 0)
+
+        state.genes[i, s] = new_room
@@ -0,0 +1,55 @@
+"""
+prevalidation.py - 排程前的快速剔除
+在任何搜尋之前以 O(n) 檢查找出注定失敗的手術 (無此房型、護理人力不足、
+主刀醫師當日全天門診 / 休假)，直接標記失敗代碼，不再進入啟發式、GA 與 Stage 2。
+"""
+
+from typing import Dict, List, Tuple
+
+from app.models.scheduling import Surgery
+
+NO_ROOM_TYPE = 'NO_ROOM_TYPE'
+INSUFFICIENT_NURSES = 'INSUFFICIENT_NURSES'
+DOCTOR_UNAVAILABLE = 'DOCTOR_UNAVAILABLE'
+# 由容量檢查 (capacity.py) 在 capacity_fast_exit 時使用
+CAPACITY_EXCEEDED = 'CAPACITY_EXCEEDED'
+
+FAILURE_REASONS = {
+    NO_ROOM_TYPE: "無此房型手術室",
+    INSUFFICIENT_NURSES: "無護理人力足夠的手術室",
+    DOCTOR_UNAVAILABLE: "醫師當日無排班",
+    CAPACITY_EXCEEDED: "當日需求超過手術室 / 醫師容量",
+}
+
+
+def failure_code(scheduler, surgery: Surgery) -> str:
+    """回傳手術的失敗代碼，可排程者回傳空字串"""
+    if not scheduler._rooms_by_type.get(surgery.surgery_room_type):
+        return NO_ROOM_TYPE
+    if not scheduler._eligible_rooms(surgery):
+        return INSUFFICIENT_NURSES
+    if surgery.doctor_id and not scheduler._get_available_shifts_for_doctor(surgery.doctor_id, surgery.surgery_date):
+        return DOCTOR_UNAVAILABLE
+    return ''
+
+
+def prevalidate(scheduler, surgeries: List[Surgery]) -> Tuple[List[Surgery], List[Surgery]]:
+    """拆成 (可排程, 剔除)；剔除者帶 failure_code / failure_reason，統計寫入 scheduler.stats"""
+    valid, rejected = [], []
+    by_code: Dict[str, int] = {}
+    for s in surgeries:
+        code = failure_code(scheduler, s)
+        if not code:
+            valid.append(s)
+            continue
+        s.failure_code = code
+        s.failure_reason = FAILURE_REASONS[code]
+        by_code[code] = by_code.get(code, 0) + 1
+        rejected.append(s)
+
+    scheduler.stats['prevalidation'] = {
+        'rejected': len(rejected),
+        'by_code': by_code,
+        'surgeries': {s.surgery_id: s.failure_code for s in rejected}
+    }
+    return valid, rejected
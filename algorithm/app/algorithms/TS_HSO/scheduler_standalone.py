@@ -8,12 +8,29 @@ scheduler_standalone.py - TS-HSO 最終旗艦修正版 (含詳細原因分析)
 """
 
 from typing import List, Dict, Optional, Tuple, Set
-from datetime import datetime, time, date, timedelta
+from datetime import time, date
+from concurrent.futures import ProcessPoolExecutor
+from time import monotonic
 import logging
-import random
+import os
 import numpy as np
 
+from app.core.config import settings
 from app.models.scheduling import Surgery, ScheduleResult
+from .encoding import ProblemEncoding
+from .population_fitness import PopulationFitness, PopulationState
+from .fitness_cache import FitnessCache, chromosome_key
+from .island_model import run_island_model
+from .tabu_search import run_tabu_search
+from .local_search import Neighbourhood, first_improvement
+from .lns import run_lns
+from .solution_store import SolutionStore, solution_key
+from .prevalidation import prevalidate, CAPACITY_EXCEEDED, FAILURE_REASONS
+from .capacity import capacity_report, overbooked_dates, trim_overbooked
+from .closed_loop import run_closed_loop
+from .occupancy import Occupancy, to_time, feasible_starts, intersect, first_aligned
+from .doctor_calendar import DoctorCalendar
+from .diagnostics import SlotReason, Diagnosis, NO_DIAGNOSIS, describe
 
 # 配置 logging
 logging.basicConfig(
@@ -29,6 +46,28 @@ def log_and_print(message: str, level: str = 'info'):
     elif level == 'warning': logger.warning(message)
     elif level == 'error': logger.error(message)
 
+# 排程模式預設值 (請求 config 中明確指定的參數優先)
+# preview：只跑建構啟發式 + Stage 2；standard：原本流程；thorough：大族群 + 島嶼平行 + memetic + LNS
+MODE_PRESETS: Dict[str, Dict] = {
+    'preview': {'stage1_engine': 'heuristic', 'verbose': False},
+    'standard': {},
+    'thorough': {
+        'ga_population': 100,
+        'ga_generations': 200,
+        'ga_islands': 4,
+        'ga_memetic': True,
+        'lns': True,
+        'lns_time_ms': 1000,
+    },
+}
+
+
+def _schedule_date_worker(init_kwargs: Dict, surgeries: List[Surgery]) -> Tuple[List[ScheduleResult], List[Surgery], Dict]:
+    """依日期拆解時的工作行程入口：以單日手術建立獨立排程器求解"""
+    scheduler = StandaloneScheduler(**init_kwargs)
+    results, failed = scheduler._schedule_batch(surgeries)
+    return results, failed, scheduler.stats
+
 class StandaloneScheduler:
     def __init__(
         self,
@@ -38,9 +77,24 @@ class StandaloneScheduler:
         doctor_schedules: Dict[str, Dict[str, str]] = None
     ):
         self.available_rooms = {room['id']: room for room in available_rooms}
+        # 候選手術室表：房型 -> 手術室，(房型, 護理人數) -> 合格手術室；每次請求只建立一次，各階段共用
+        self._rooms_by_type: Dict[str, List[Dict]] = {}
+        for room in self.available_rooms.values():
+            self._rooms_by_type.setdefault(room['room_type'], []).append(room)
+        self._eligibility: Dict[Tuple[str, int], List[Dict]] = {}
         self.existing_schedules = existing_schedules or []
-        self.config = config or {}
+        config = config or {}
+        self.MODE = config.get('mode', 'standard')
+        if self.MODE not in MODE_PRESETS:
+            log_and_print(f"[WARN] 未知的 mode={self.MODE}，改用 standard", 'warning')
+            self.MODE = 'standard'
+        self.config = dict(MODE_PRESETS[self.MODE], **config)
         self.doctor_schedules = doctor_schedules or {}
+        # 執行統計 (由 API 併入回應的 statistics)
+        self.stats: Dict = {}
+        
+        # 是否輸出 Stage 1 / Stage 2 逐筆明細
+        self.VERBOSE = self.config.get('verbose', True)
         
         # GA 參數
         self.POPULATION_SIZE = self.config.get('ga_population', 50)
@@ -48,6 +102,81 @@ class StandaloneScheduler:
         self.CROSSOVER_RATE = 0.8
         self.MUTATION_RATE = 0.2
         self.ELITISM_RATE = 0.1
+        # 交配後差異基因數超過此值時整列重算，否則逐基因增量更新
+        self.DELTA_MAX_MOVES = self.config.get('ga_delta_max_moves', 32)
+        # 適應度快取與族群去重 (重複個體以隨機換房重新播種)
+        self.FITNESS_CACHE_SIZE = self.config.get('fitness_cache_size', 4096)
+        self.GA_DEDUP = self.config.get('ga_dedup', True)
+        self.RESEED_MOVES = self.config.get('ga_reseed_moves', 3)
+        # 島嶼模型：各子族群在獨立行程演化，每隔 interval 代遷移最佳個體
+        self.GA_ISLANDS = self.config.get('ga_islands', 1)
+        self.MIGRATION_INTERVAL = self.config.get('ga_migration_interval', 10)
+        self.MIGRATION_SIZE = self.config.get('ga_migration_size', 2)
+        self.ISLAND_WORKERS = self.config.get('ga_island_workers')
+        # Memetic：每代對前 top_k 名個體做有上限的 first-improvement 區域搜尋
+        self.GA_MEMETIC = self.config.get('ga_memetic', False)
+        self.MEMETIC_TOP_K = self.config.get('ga_memetic_top_k', 3)
+        self.MEMETIC_MAX_EVALUATIONS = self.config.get('ga_memetic_max_evaluations', 200)
+        self.MEMETIC_SWAP_RATE = self.config.get('ga_memetic_swap_rate', 0.3)
+        # 對稱破除：可互換手術室以標準形去重 / 快取，突變不重複嘗試等價空房
+        self.SYMMETRY_BREAKING = self.config.get('symmetry_breaking', True)
+        # 依日期拆解：不同日期的手術互不影響，可各自獨立 (平行) 求解
+        self.DECOMPOSE_BY_DATE = self.config.get('decompose_by_date', False)
+        self.DECOMPOSE_WORKERS = self.config.get('decompose_workers')
+        # 時間預算 (毫秒)：Stage 1 用完 (1 - stage2 保留比例) 即回傳目前最佳解
+        self.TIME_BUDGET_MS = self.config.get('time_budget_ms')
+        self.STAGE2_BUDGET_SHARE = self.config.get('stage2_budget_share', 0.2)
+        self._stage1_deadline: Optional[float] = None
+        self._stage2_deadline: Optional[float] = None
+        self.rng = np.random.default_rng(self.config.get('random_seed'))
+        self._ga_stop_reason = 'generations'
+        # 以適應度上界提前終止 GA
+        self.EARLY_STOP_AT_BOUND = self.config.get('early_stop_at_bound', True)
+        # 與上界的相對差距小於此值即視為最佳 (0 表示必須恰好達到上界)
+        self.BOUND_GAP_TOLERANCE = float(self.config.get('bound_gap_tolerance', 0.0))
+        self._fitness_upper_bound: Optional[float] = None
+        # Stage 1 最佳化引擎：'ga' (遺傳演算法)、'tabu' (禁忌搜尋) 或 'heuristic' (只用建構啟發式)
+        self.STAGE1_ENGINE = self.config.get('stage1_engine', 'ga')
+        if self.STAGE1_ENGINE not in ('ga', 'tabu', 'heuristic'):
+            log_and_print(f"[WARN] 未知的 stage1_engine={self.STAGE1_ENGINE}，改用 GA", 'warning')
+            self.STAGE1_ENGINE = 'ga'
+        self.TABU_ITERATIONS = self.config.get('tabu_iterations', 2000)
+        self.TABU_TENURE = self.config.get('tabu_tenure', 10)
+        self.TABU_NEIGHBOURHOOD = self.config.get('tabu_neighbourhood', 48)
+        self.TABU_SWAP_RATE = self.config.get('tabu_swap_rate', 0.3)
+        self.TABU_PATIENCE = self.config.get('tabu_patience', 300)
+        # LNS：Stage 2 之後以破壞與重建改善完整排程
+        self.LNS = self.config.get('lns', False)
+        self.LNS_TIME_MS = self.config.get('lns_time_ms', 500)
+        self.LNS_ITERATIONS = self.config.get('lns_iterations', 200)
+        self.LNS_RUIN_SIZE = self.config.get('lns_ruin_size', 8)
+        # GA 連續多少代無改善即視為收斂
+        self.GA_PATIENCE = self.config.get('ga_patience', 30)
+        # Warm start：以「日期區間 + 手術室集合」保存上次結果，重排同一區間時由此出發並縮短收斂門檻
+        self.WARM_START = self.config.get('warm_start', False)
+        # 檔案路徑只取自伺服器設定 (WARM_START_PATH)；請求 config 由 API 直接傳入，不可決定讀寫哪個檔案
+        self.WARM_START_PATH = settings.warm_start_path
+        if 'warm_start_path' in self.config:
+            log_and_print("[WARN] 忽略請求 config 中的 warm_start_path，請改用伺服器設定 WARM_START_PATH", 'warning')
+        self.WARM_START_PATIENCE = self.config.get('warm_start_patience', 10)
+        # 依日期拆解時由主行程切好各日期的前次解傳入子排程器
+        self._warm_solution: Optional[Dict[str, str]] = self.config.get('warm_start_solution')
+        self._patience = self.GA_PATIENCE
+        # 排程前剔除注定失敗的手術 (無房型 / 護理人力不足 / 醫師全天門診或休假)
+        self.PREVALIDATE = self.config.get('prevalidate', True)
+        # Stage 1 適應度納入醫師班別 (B 只能夜班、C 只能早班)，減少 Stage 2 失敗與救援
+        self.DOCTOR_AWARE_FITNESS = self.config.get('doctor_aware_fitness', True)
+        # 閉環迭代：只把有失敗 / 延遲的 (日期, 房型) 送回 Stage 1，並懲罰前次失敗的房間
+        self.CLOSED_LOOP = self.config.get('closed_loop', False)
+        self.CLOSED_LOOP_ITERATIONS = self.config.get('closed_loop_iterations', 3)
+        self.CLOSED_LOOP_TIME_MS = self.config.get('closed_loop_time_ms', 2000)
+        # (surgery_id, room_id) -> 額外放置懲罰，閉環迭代時累加
+        self._placement_penalties: Dict[Tuple[str, str], float] = {}
+        # 各日期容量檢查；fast exit 時超額資格類別 / 超時醫師的手術不進入最佳化，直接回報失敗
+        self.CAPACITY_CHECK = self.config.get('capacity_check', True)
+        self.CAPACITY_FAST_EXIT = self.config.get('capacity_fast_exit', False)
+        # 延遲 / 失敗原因診斷；大量批次排程可關閉，省下延遲與失敗手術的逐格重播
+        self.DIAGNOSTICS = self.config.get('diagnostics', True)
         
         # 權重
         ahp_weights = self.config.get('ahp_weights', {})
@@ -63,12 +192,57 @@ class StandaloneScheduler:
             'D': {'name': '全天門診', 'available_shifts': [], 'duration': 0.0},
             'E': {'name': '休假', 'available_shifts': [], 'duration': 0.0}
         }
+        # 每次請求編譯一次：(醫師, 日期) → 班別代碼與可排分鐘遮罩
+        self.doctor_calendar = DoctorCalendar(self.doctor_schedules, self.DOCTOR_SCHEDULE_TYPES)
         
         log_and_print(f"初始化排程器: GA世代={self.GENERATIONS}, 醫師緩衝={self.DOCTOR_BUFFER_MINUTES}min")
     
     def schedule(self, surgeries: List[Surgery]) -> Tuple[List[ScheduleResult], List[Surgery]]:
         if not surgeries: return [], []
         
+        rejected: List[Surgery] = []
+        if self.PREVALIDATE:
+            surgeries, rejected = prevalidate(self, surgeries)
+            if rejected:
+                log_and_print(f"預先剔除 {len(rejected)} 台無法排程的手術: {self.stats['prevalidation']['by_code']}")
+            if not surgeries:
+                return [], rejected
+        
+        if self.CAPACITY_CHECK:
+            report = capacity_report(self, surgeries)
+            self.stats['capacity'] = report
+            overbooked = overbooked_dates(report)
+            if overbooked:
+                log_and_print(f"容量不足日期: {sorted(overbooked)}", 'warning')
+            if overbooked and self.CAPACITY_FAST_EXIT:
+                # 超額的資格類別與超時醫師只剔除放不下的手術 (長手術先)，其餘手術照常排程
+                surgeries, trimmed = trim_overbooked(self, surgeries)
+                for s in trimmed:
+                    s.failure_code = CAPACITY_EXCEEDED
+                    s.failure_reason = FAILURE_REASONS[CAPACITY_EXCEEDED]
+                rejected.extend(trimmed)
+                if not surgeries:
+                    return [], rejected
+        
+        store = key = None
+        if self.WARM_START:
+            store = SolutionStore(self.WARM_START_PATH)
+            key = solution_key({s.surgery_date for s in surgeries}, self.available_rooms.keys())
+            self._warm_solution = store.get(key)
+        
+        if self.DECOMPOSE_BY_DATE and len({s.surgery_date for s in surgeries}) > 1:
+            results, failed = self._schedule_by_date(surgeries)
+        else:
+            results, failed = self._schedule_batch(surgeries)
+        
+        if store is not None:
+            store.put(key, {r.surgery_id: r.room_id for r in results})
+        return results, rejected + failed
+    
+    def _schedule_batch(self, surgeries: List[Surgery]) -> Tuple[List[ScheduleResult], List[Surgery]]:
+        started = monotonic()
+        self._start_time_budget(started)
+        
         print("\n" + "="*80)
         print(f"開始排程 {len(surgeries)} 台手術")
         print("="*80)
@@ -76,21 +250,104 @@ class StandaloneScheduler:
         # Stage 1
         print("\n[Stage 1] 開始 GA 手術室分配...")
         allocation = self._stage1_ga_allocation(surgeries)
+        stage1_done = monotonic()
         
         # 顯示詳情與統計
-        self._print_stage1_details(allocation, surgeries)
-        self._print_daily_stats(allocation, surgeries)
+        if self.VERBOSE:
+            self._print_stage1_details(allocation, surgeries)
+            self._print_daily_stats(allocation, surgeries)
         
         # Stage 2
         print("\n[Stage 2] 開始 Greedy + AHP 時間排程 (含防延遲救援)...")
+        stage2_start = monotonic()
         results, failed = self._stage2_greedy_scheduling(surgeries, allocation)
+        if self.CLOSED_LOOP:
+            print("\n[Closed Loop] 重新分配有失敗 / 延遲的日期與房型...")
+            results, failed = run_closed_loop(self, surgeries, allocation, results, failed)
+        if self.LNS:
+            print("\n[LNS] 破壞與重建改善排程...")
+            results, failed = run_lns(self, surgeries, results, failed)
+        describe(results, failed, self.DIAGNOSTICS)
+        stage2_done = monotonic()
         
         # 顯示 Stage 2 結果
-        self._print_stage2_details(results, failed)
+        if self.VERBOSE:
+            self._print_stage2_details(results, failed)
+        
+        if self.TIME_BUDGET_MS is not None:
+            self.stats['time_budget'] = {
+                'budget_ms': self.TIME_BUDGET_MS,
+                'stage1_ms': round((stage1_done - started) * 1000, 1),
+                'stage2_ms': round((stage2_done - stage2_start) * 1000, 1),
+                'budget_exhausted': self.stats.get('stage1', {}).get('stop_reason') == 'time_budget'
+            }
 
         print("="*80 + "\n")
         return results, failed
     
+    def _start_time_budget(self, started: float):
+        if self.TIME_BUDGET_MS is None:
+            self._stage1_deadline = self._stage2_deadline = None
+            return
+        budget = self.TIME_BUDGET_MS / 1000
+        self._stage1_deadline = started + budget * (1 - self.STAGE2_BUDGET_SHARE)
+        self._stage2_deadline = started + budget
+    
+    def _stage1_time_up(self) -> bool:
+        return self._stage1_deadline is not None and monotonic() >= self._stage1_deadline
+    
+    def _stage2_time_up(self) -> bool:
+        return self._stage2_deadline is not None and monotonic() >= self._stage2_deadline
+    
+    def _schedule_by_date(self, surgeries: List[Surgery]) -> Tuple[List[ScheduleResult], List[Surgery]]:
+        """
+        依 surgery_date 拆成獨立子問題：Stage 1 的房間時數 / 醫師跨房與 Stage 2 的資源衝突
+        皆以日期為鍵，各日期分別求解後合併即等同整批求解。
+        """
+        by_date: Dict[date, List[Surgery]] = {}
+        for s in surgeries:
+            by_date.setdefault(s.surgery_date, []).append(s)
+        dates = sorted(by_date.keys())
+        workers = self.DECOMPOSE_WORKERS or min(len(dates), os.cpu_count() or 1)
+        
+        # 子排程器不再拆解，也不再開島嶼行程池，避免巢狀平行
+        sub_config = dict(self.config, decompose_by_date=False, ga_islands=1, warm_start=False, prevalidate=False, capacity_check=False)
+        # 工作行程數少於日期數時，各日期依序分攤總預算
+        rounds = -(-len(dates) // workers)
+        if self.TIME_BUDGET_MS is not None:
+            sub_config['time_budget_ms'] = self.TIME_BUDGET_MS / rounds
+        if self.LNS:
+            sub_config['lns_time_ms'] = self.LNS_TIME_MS / rounds
+        tasks = [
+            (
+                dict(
+                    available_rooms=list(self.available_rooms.values()),
+                    existing_schedules=[e for e in self.existing_schedules if e.get('scheduled_date') == d],
+                    config=dict(sub_config, warm_start_solution=self._warm_solution_for(by_date[d])),
+                    doctor_schedules=self.doctor_schedules
+                ),
+                by_date[d]
+            )
+            for d in dates
+        ]
+        
+        print(f"\n[Decompose] 依日期拆解為 {len(dates)} 個子問題 (workers={workers})")
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                outputs = list(pool.map(_schedule_date_worker, *zip(*tasks)))
+        else:
+            outputs = [_schedule_date_worker(*task) for task in tasks]
+        
+        results, failed, per_date = [], [], {}
+        for d, (date_results, date_failed, date_stats) in zip(dates, outputs):
+            results.extend(date_results)
+            failed.extend(date_failed)
+            per_date[str(d)] = dict(
+                date_stats, surgeries=len(by_date[d]), scheduled=len(date_results), failed=len(date_failed)
+            )
+        self.stats['decomposition'] = {'dates': len(dates), 'workers': workers, 'per_date': per_date}
+        return results, failed
+    
     # ==================== 核心工具 ====================
     
     def _get_room_max_hours(self, room: Dict) -> float:
@@ -100,17 +357,31 @@ class StandaloneScheduler:
         if room.get('graveyard_shift', False): max_hours += 8.0
         return max_hours
 
-    def _get_current_load(self, room_id: str, date: date, allocation: Dict, surgeries: List[Surgery]) -> float:
-        load = 0.0
-        for s_id, alloc in allocation.items():
-            if alloc.get('room_id') == room_id:
-                s = next((surg for surg in surgeries if surg.surgery_id == s_id), None)
-                if s and s.surgery_date == date:
-                    load += (s.duration + 0.5)
-        return load
+    def _get_current_load(self, room_id: str, date: date, room_load: Dict[Tuple[str, date], float]) -> float:
+        return room_load.get((room_id, date), 0.0)
+
+    def _book_room_load(self, room_load: Dict[Tuple[str, date], float], room_id: str, surgery: Surgery):
+        key = (room_id, surgery.surgery_date)
+        room_load[key] = room_load.get(key, 0.0) + (surgery.duration + 0.5)
+
+    def _index_surgeries(self, surgeries: List[Surgery]) -> Dict[str, Surgery]:
+        return {s.surgery_id: s for s in surgeries}
     
     def _check_nurse_requirement(self, room: Dict, surgery: Surgery) -> bool:
         return room.get('nurse_count', 0) >= surgery.nurse_count
+
+    def _eligible_rooms(self, surgery: Surgery) -> List[Dict]:
+        key = (surgery.surgery_room_type, surgery.nurse_count)
+        rooms = self._eligibility.get(key)
+        if rooms is None:
+            rooms = []
+            for room in self._rooms_by_type.get(surgery.surgery_room_type, []):
+                if self._check_nurse_requirement(room, surgery):
+                    rooms.append(room)
+                else:
+                    print(f"  [DEBUG] 手術 {surgery.surgery_id} (需{surgery.nurse_count}人) 跳過 {room['id']} (僅{room.get('nurse_count')}人)")
+            self._eligibility[key] = rooms
+        return rooms
     
     def _check_shift_availability(self, room: Dict, surgery: Surgery, start_time: time) -> bool:
         hour = start_time.hour
@@ -121,44 +392,78 @@ class StandaloneScheduler:
     # ==================== Stage 1: GA 手術室分配 ====================
     
     def _stage1_ga_allocation(self, surgeries: List[Surgery]) -> Dict[str, Dict]:
-        print("  建構啟發式初始解 (目標平均 6.5~7.5h 策略)...")
-        initial_solution = self._constructive_heuristic(surgeries)
+        warm = self._warm_start_allocation(surgeries)
+        if warm is not None:
+            print(f"  Warm start：沿用前次分配 {len(warm)} 台，其餘以啟發式補入...")
+            initial_solution = self._constructive_heuristic(surgeries, seed_allocation=warm)
+            self._patience = self.WARM_START_PATIENCE
+        else:
+            print("  建構啟發式初始解 (目標平均 6.5~7.5h 策略)...")
+            initial_solution = self._constructive_heuristic(surgeries)
+            self._patience = self.GA_PATIENCE
+        
+        if self.STAGE1_ENGINE == 'heuristic':
+            self.stats['stage1'] = {'engine': 'heuristic'}
+            return initial_solution
+        
+        if self.STAGE1_ENGINE == 'tabu':
+            print(f"  執行禁忌搜尋優化 (最多 {self.TABU_ITERATIONS} 次迭代)...")
+            return self._tabu_search(surgeries, initial_solution)
         
         print(f"  執行 GA 優化 ({self.GENERATIONS} 世代)...")
         optimized_solution = self._genetic_algorithm(surgeries, initial_solution)
         
         return optimized_solution
     
-    def _constructive_heuristic(self, surgeries: List[Surgery]) -> Dict[str, Dict]:
+    def _warm_solution_for(self, surgeries: List[Surgery]) -> Optional[Dict[str, str]]:
+        if not self._warm_solution:
+            return None
+        return {s.surgery_id: self._warm_solution[s.surgery_id] for s in surgeries if s.surgery_id in self._warm_solution}
+
+    def _warm_start_allocation(self, surgeries: List[Surgery]) -> Optional[Dict[str, Dict]]:
+        """把前次解映射到仍存在的手術上 (房間須仍可用且符合資格)，無可用前次解時回傳 None"""
+        previous = self._warm_solution_for(surgeries)
+        if not previous:
+            return None
         allocation = {}
-        sorted_surgeries = sorted(surgeries, key=lambda s: s.duration, reverse=True)
-        debug_msg_shown = set()
+        for s in surgeries:
+            room_id = previous.get(s.surgery_id)
+            if room_id is not None and any(room['id'] == room_id for room in self._eligible_rooms(s)):
+                allocation[s.surgery_id] = {'room_id': room_id, 'suggested_shift': 'morning', 'score': 0}
+        self.stats['warm_start'] = {
+            'reused': len(allocation),
+            'dropped': len(self._warm_solution) - len(allocation),
+            'inserted': len(surgeries) - len(allocation)
+        }
+        return allocation or None
+
+    def _constructive_heuristic(self, surgeries: List[Surgery], seed_allocation: Optional[Dict[str, Dict]] = None) -> Dict[str, Dict]:
+        """seed_allocation 中的手術保留原房間並先計入負載，其餘依 packing 策略放置"""
+        allocation = dict(seed_allocation or {})
+        # (room_id, date) -> 已分配時數，隨每台手術放置即時累加
+        room_load: Dict[Tuple[str, date], float] = {}
+        by_id = self._index_surgeries(surgeries)
+        for s_id, alloc in allocation.items():
+            self._book_room_load(room_load, alloc['room_id'], by_id[s_id])
+        sorted_surgeries = sorted(
+            (s for s in surgeries if s.surgery_id not in allocation), key=lambda s: s.duration, reverse=True
+        )
 
         for surgery in sorted_surgeries:
-            room_type = surgery.surgery_room_type
-            candidates = []
-            
-            for room in self.available_rooms.values():
-                if room['room_type'] != room_type: continue
-                if not self._check_nurse_requirement(room, surgery):
-                    check_key = (room['id'], surgery.nurse_count)
-                    if check_key not in debug_msg_shown:
-                        print(f"  [DEBUG] 手術 {surgery.surgery_id} (需{surgery.nurse_count}人) 跳過 {room['id']} (僅{room.get('nurse_count')}人)")
-                        debug_msg_shown.add(check_key)
-                    continue
-                candidates.append(room)
+            candidates = self._eligible_rooms(surgery)
             
             if not candidates:
-                fallback = [r for r in self.available_rooms.values() if r['room_type'] == room_type]
+                fallback = self._rooms_by_type.get(surgery.surgery_room_type, [])
                 if fallback:
                     allocation[surgery.surgery_id] = {'room_id': fallback[0]['id'], 'score': -999}
+                    self._book_room_load(room_load, fallback[0]['id'], surgery)
                 continue
 
             surgery_date = surgery.surgery_date
             room_status = []
             
             for room in candidates:
-                current_load = self._get_current_load(room['id'], surgery_date, allocation, surgeries)
+                current_load = self._get_current_load(room['id'], surgery_date, room_load)
                 max_phys_limit = self._get_room_max_hours(room)
                 new_load = current_load + surgery.duration + 0.5
                 
@@ -197,62 +502,205 @@ class StandaloneScheduler:
                 'suggested_shift': 'morning',
                 'score': 0
             }
+            self._book_room_load(room_load, selected_status['room']['id'], surgery)
         return allocation
 
+    def _build_fitness_model(self, surgeries: List[Surgery]) -> Tuple[ProblemEncoding, PopulationFitness]:
+        encoding = ProblemEncoding(
+            surgeries, self.available_rooms, self._eligible_rooms, self.SYMMETRY_BREAKING, self._placement_penalties
+        )
+        evaluator = PopulationFitness(
+            encoding,
+            np.array([self._get_room_max_hours(room) for room in encoding.rooms]),
+            self._doctor_shift_matrix(encoding.surgeries) if self.DOCTOR_AWARE_FITNESS else None,
+            self._placement_penalty_matrix(encoding) if self._placement_penalties else None
+        )
+        return encoding, evaluator
+
+    def _placement_penalty_matrix(self, encoding: ProblemEncoding) -> np.ndarray:
+        penalty = np.zeros((encoding.n_surgeries, encoding.n_rooms))
+        for (s_id, room_id), value in self._placement_penalties.items():
+            i, r = encoding.surgery_index.get(s_id), encoding.room_index.get(room_id)
+            if i is not None and r is not None:
+                penalty[i, r] = value
+        return penalty
+
+    def _doctor_shift_matrix(self, surgeries: List[Surgery]) -> np.ndarray:
+        """(手術數, 2)：主刀醫師當日可否排 (早班, 夜班)，取自排班日曆"""
+        rows = [
+            self.doctor_calendar.shift_flags(s.doctor_id, s.surgery_date) if s.doctor_id else (True, True)
+            for s in surgeries
+        ]
+        return np.array(rows, dtype=bool).reshape(len(surgeries), 2)
+
+    def _prepare_stage1(self, surgeries: List[Surgery]) -> Tuple[ProblemEncoding, PopulationFitness]:
+        encoding, evaluator = self._build_fitness_model(surgeries)
+        self.stats['symmetry'] = {
+            'rooms': encoding.n_rooms,
+            'room_classes': encoding.n_room_classes,
+            'enabled': encoding.symmetry_breaking
+        }
+        # 達到適應度上界即為最佳解，搜尋可立即停止
+        self._fitness_upper_bound = evaluator.upper_bound() if self.EARLY_STOP_AT_BOUND else None
+        return encoding, evaluator
+
+    def _tabu_search(self, surgeries: List[Surgery], initial_solution: Dict) -> Dict[str, Dict]:
+        encoding, evaluator = self._prepare_stage1(surgeries)
+        best_genes, best_fitness = run_tabu_search(self, evaluator, encoding.encode(initial_solution))
+        self.stats['optimality'] = self._optimality_report(evaluator, best_genes, best_fitness)
+        return encoding.decode(best_genes)
+
     def _genetic_algorithm(self, surgeries: List[Surgery], initial_solution: Dict) -> Dict[str, Dict]:
-        population = self._initialize_population(surgeries, initial_solution)
-        best_solution = initial_solution.copy()
-        best_fitness = self._calculate_fitness(initial_solution, surgeries)
+        encoding, evaluator = self._prepare_stage1(surgeries)
+        
+        if self.GA_ISLANDS > 1:
+            best_genes, best_fitness = run_island_model(self, surgeries, encoding.encode(initial_solution))
+        else:
+            cache = FitnessCache(self.FITNESS_CACHE_SIZE)
+            state = evaluator.build_state(self._initialize_population(encoding, initial_solution))
+            _, best_genes, best_fitness, generations_run, reseeded = self._evolve(
+                state, evaluator, cache, self.GENERATIONS
+            )
+            self.stats['stage1'] = {
+                'engine': 'ga',
+                'generations': generations_run,
+                'best_fitness': round(best_fitness, 2),
+                'stop_reason': self._ga_stop_reason
+            }
+            self.stats['fitness_cache'] = dict(cache.stats(), duplicates_reseeded=reseeded)
+        
+        self.stats['optimality'] = self._optimality_report(evaluator, best_genes, best_fitness)
+        return encoding.decode(best_genes)
+
+    def _reached_upper_bound(self, fitness: float) -> bool:
+        if self._fitness_upper_bound is None:
+            return False
+        return fitness >= self._fitness_upper_bound * (1 - self.BOUND_GAP_TOLERANCE) - 1e-9
+
+    def _optimality_report(self, evaluator: PopulationFitness, best_genes: np.ndarray, best_fitness: float) -> Dict:
+        encoding = evaluator.encoding
+        upper = float(evaluator.upper_bound())
+        assigned = best_genes >= 0
+        used = set(zip(encoding.date_idx[assigned].tolist(), best_genes[assigned].tolist()))
+        per_date = {}
+        for d, min_rooms in sorted(evaluator.min_room_counts().items()):
+            per_date[str(encoding.dates[d])] = {
+                'min_rooms': min_rooms,
+                'rooms_used': sum(1 for day, _ in used if day == d)
+            }
+        gap = max(upper - best_fitness, 0.0)
+        return {
+            'fitness_upper_bound': round(upper, 2),
+            'best_fitness': round(best_fitness, 2),
+            'gap': round(gap, 2),
+            'gap_pct': round(gap / upper * 100, 2) if upper > 0 else 0.0,
+            'per_date': per_date
+        }
+
+    def _evolve(
+        self,
+        state: PopulationState,
+        evaluator: PopulationFitness,
+        cache: FitnessCache,
+        generations: int
+    ) -> Tuple[PopulationState, np.ndarray, float, int, int]:
+        """
+        演化 generations 代 (或提前收斂 / 時間預算用完)，回傳 (族群, 最佳基因, 最佳適應度, 執行世代數, 重播種數)；
+        停止原因記於 self._ga_stop_reason
+        """
+        pop_size = len(state)
+        best_genes = state.genes[0].copy()
+        best_fitness = evaluator.scores(state)[0]
         no_improvement = 0
+        reseeded = 0
+        generations_run = 0
+        self._ga_stop_reason = 'generations'
+        neighbourhood = Neighbourhood(evaluator.encoding) if self.GA_MEMETIC else None
+        local_optima: Set[bytes] = set()
         
-        for generation in range(self.GENERATIONS):
-            fitness_scores = [self._calculate_fitness(ind, surgeries) for ind in population]
-            gen_best_idx = np.argmax(fitness_scores)
+        for generation in range(generations):
+            generations_run = generation + 1
+            reseeded += self._deduplicate(state, evaluator, cache)
+            if neighbourhood is not None:
+                self._polish_elites(state, evaluator, neighbourhood, local_optima)
+            fitness_scores = evaluator.scores(state)
+            gen_best_idx = int(np.argmax(fitness_scores))
             
             if fitness_scores[gen_best_idx] > best_fitness:
                 best_fitness = fitness_scores[gen_best_idx]
-                best_solution = population[gen_best_idx].copy()
+                best_genes = state.genes[gen_best_idx].copy()
                 no_improvement = 0
             else:
                 no_improvement += 1
             
-            if no_improvement >= 30:
+            if self._reached_upper_bound(best_fitness):
+                print(f"    ✓ GA 於世代 {generation+1} 達到適應度上界, Fitness={best_fitness:.2f}")
+                self._ga_stop_reason = 'optimal'
+                break
+            
+            if no_improvement >= self._patience:
                 print(f"    ✓ GA 提前收斂於世代 {generation+1}, Fitness={best_fitness:.2f}")
+                self._ga_stop_reason = 'converged'
+                break
+            
+            if self._stage1_time_up():
+                print(f"    ⏱ GA 時間預算用完於世代 {generation+1}, Fitness={best_fitness:.2f}")
+                self._ga_stop_reason = 'time_budget'
                 break
                 
-            selected = self._selection(population, fitness_scores)
-            offspring = self._crossover(selected)
-            offspring = self._mutation(offspring, surgeries)
-            elite_size = max(1, int(self.POPULATION_SIZE * self.ELITISM_RATE))
+            selected = self._selection(state, fitness_scores)
+            offspring = self._crossover(selected, evaluator, cache)
+            offspring = self._mutation(offspring, evaluator)
+            elite_size = max(1, int(pop_size * self.ELITISM_RATE))
             elite_indices = np.argsort(fitness_scores)[-elite_size:]
-            elite = [population[i] for i in elite_indices]
-            population = elite + offspring[:self.POPULATION_SIZE - elite_size]
-            
-        return best_solution
-
-    def _initialize_population(self, surgeries: List[Surgery], initial_solution: Dict) -> List[Dict]:
-        population = [initial_solution]
-        for _ in range(self.POPULATION_SIZE - 1):
-            individual = {}
-            for surgery in surgeries:
-                room_type = surgery.surgery_room_type
-                candidates = [r for r in self.available_rooms.values() if r['room_type'] == room_type and self._check_nurse_requirement(r, surgery)]
-                if not candidates: continue
-                selected = random.choice(candidates)
-                individual[surgery.surgery_id] = {'room_id': selected['id'], 'suggested_shift': 'morning'}
-            population.append(individual)
+            state = PopulationState.concat([
+                state.take(elite_indices), offspring.take(slice(0, pop_size - elite_size))
+            ])
+        
+        return state, best_genes, float(best_fitness), generations_run, reseeded
+
+    def _polish_elites(
+        self,
+        state: PopulationState,
+        evaluator: PopulationFitness,
+        neighbourhood: Neighbourhood,
+        local_optima: Set[bytes]
+    ):
+        """Memetic 步驟：就地精修目前分數最高的 top_k 個個體；已知的區域最佳解 (如保留下來的菁英) 不重複搜尋"""
+        top_k = min(max(int(self.MEMETIC_TOP_K), 0), len(state))
+        if top_k == 0:
+            return
+        counts = self.stats.setdefault('memetic', {'polished': 0, 'improved': 0, 'evaluations': 0})
+        for row in np.argsort(evaluator.raw_scores(state))[-top_k:].tolist():
+            if chromosome_key(state.genes[row]) in local_optima:
+                continue
+            gain, evaluations = first_improvement(
+                evaluator, state, row, neighbourhood, self.rng,
+                self.MEMETIC_MAX_EVALUATIONS, self.MEMETIC_SWAP_RATE
+            )
+            if evaluations < self.MEMETIC_MAX_EVALUATIONS:
+                local_optima.add(chromosome_key(state.genes[row]))
+            counts['polished'] += 1
+            counts['improved'] += gain > 0
+            counts['evaluations'] += evaluations
+
+    def _initialize_population(self, encoding: ProblemEncoding, initial_solution: Dict) -> np.ndarray:
+        population = encoding.random_population(self.POPULATION_SIZE, self.rng)
+        population[0] = encoding.encode(initial_solution)
         return population
 
     def _calculate_fitness(self, allocation: Dict, surgeries: List[Surgery]) -> float:
+        """逐一計算的參考實作 (GA 使用 PopulationFitness)；tests/test_population_fitness.py 以此核對兩者分數相同"""
         room_usage = {} 
         doctor_rooms_map = {}
         nurse_waste = 0
         penalty = 0
         
         allocated_count = 0
+        surgery_index = self._index_surgeries(surgeries)
         for s_id, alloc in allocation.items():
             if 'room_id' not in alloc: continue
-            s = next((x for x in surgeries if x.surgery_id == s_id), None)
+            s = surgery_index.get(s_id)
             if not s: continue
             allocated_count += 1
             room_id = alloc['room_id']
@@ -289,51 +737,106 @@ class StandaloneScheduler:
         score -= nurse_waste * 2
         return max(0, score)
     
-    def _selection(self, population, fitness_scores):
-        selected = []
-        for _ in range(len(population)):
-            candidates = random.sample(range(len(population)), 3)
-            best_idx = max(candidates, key=lambda i: fitness_scores[i])
-            selected.append(population[best_idx].copy())
-        return selected
-
-    def _crossover(self, parents):
-        offspring = []
-        for i in range(0, len(parents)-1, 2):
-            if random.random() < self.CROSSOVER_RATE:
-                p1, p2 = parents[i], parents[i+1]
-                keys = list(p1.keys())
-                if not keys: 
-                    offspring.extend([p1, p2])
-                    continue
-                point = random.randint(0, len(keys)-1)
-                c1, c2 = p1.copy(), p2.copy()
-                for k in keys[point:]:
-                    if k in p2: c1[k] = p2[k]
-                    if k in p1: c2[k] = p1[k]
-                offspring.extend([c1, c2])
-            else:
-                offspring.extend([parents[i], parents[i+1]])
+    def _selection(self, population: PopulationState, fitness_scores: np.ndarray) -> PopulationState:
+        # 3 取 1 錦標賽：一次抽出所有參賽者索引，以列索引複製勝者 (連同適應度中間量)
+        n = len(population)
+        contestants = self.rng.integers(0, n, size=(n, 3))
+        winners = contestants[np.arange(n), np.argmax(fitness_scores[contestants], axis=1)]
+        return population.take(winners)
+
+    def _crossover(self, parents: PopulationState, evaluator: PopulationFitness, cache: FitnessCache = None) -> PopulationState:
+        # 單點交配：成對個體交換切點之後的基因；差異少時以增量更新，否則整列重算
+        n_pairs = len(parents) // 2
+        offspring = parents.take(slice(0, n_pairs * 2))
+        genes = offspring.genes
+        n_genes = genes.shape[1]
+        if n_pairs == 0 or n_genes == 0:
+            return offspring
+        
+        do_cross = self.rng.random(n_pairs) < self.CROSSOVER_RATE
+        points = self.rng.integers(0, n_genes, size=n_pairs)
+        rebuild = []
+        for k in np.flatnonzero(do_cross):
+            a, b, point = 2 * k, 2 * k + 1, points[k]
+            diff = np.flatnonzero(genes[a, point:] != genes[b, point:]) + point
+            if len(diff) > self.DELTA_MAX_MOVES:
+                tail = genes[a, point:].copy()
+                genes[a, point:] = genes[b, point:]
+                genes[b, point:] = tail
+                rebuild.extend((a, b))
+                continue
+            for s_idx in diff.tolist():
+                r_a, r_b = int(genes[a, s_idx]), int(genes[b, s_idx])
+                evaluator.apply_move(offspring, a, s_idx, r_b)
+                evaluator.apply_move(offspring, b, s_idx, r_a)
+        evaluator.refresh(offspring, np.array(rebuild, dtype=np.int64), cache)
         return offspring
 
-    def _mutation(self, population, surgeries):
-        for ind in population:
-            if random.random() < self.MUTATION_RATE:
-                s = random.choice(surgeries)
-                curr = ind.get(s.surgery_id, {}).get('room_id')
-                candidates = [
-                    r for r in self.available_rooms.values()
-                    if r['room_type'] == s.surgery_room_type 
-                    and r['id'] != curr
-                    and self._check_nurse_requirement(r, s)
-                ]
-                if candidates:
-                    ind[s.surgery_id] = {'room_id': random.choice(candidates)['id'], 'suggested_shift': 'morning'}
+    def _mutation(self, population: PopulationState, evaluator: PopulationFitness) -> PopulationState:
+        encoding = evaluator.encoding
+        if encoding.n_surgeries == 0:
+            return population
+        mutate_rows = np.flatnonzero(self.rng.random(len(population)) < self.MUTATION_RATE)
+        genes = self.rng.integers(0, encoding.n_surgeries, size=len(mutate_rows))
+        for row, s_idx in zip(mutate_rows.tolist(), genes.tolist()):
+            self._random_move(population, row, s_idx, evaluator)
         return population
 
+    def _random_move(self, population: PopulationState, row: int, s_idx: int, evaluator: PopulationFitness):
+        encoding = evaluator.encoding
+        current = int(population.genes[row, s_idx])
+        cands = encoding.candidates[s_idx]
+        cands = cands[cands != current]
+        if encoding.symmetry_breaking and len(cands):
+            cands = self._break_room_symmetry(population, row, s_idx, current, cands, evaluator)
+        if len(cands):
+            evaluator.apply_move(population, row, s_idx, int(self.rng.choice(cands)))
+
+    def _break_room_symmetry(self, population, row, s_idx, current, cands, evaluator) -> np.ndarray:
+        """同類別的當日空房互為對稱，只保留索引最小的一間；獨佔同類房時移入空房等於不動"""
+        encoding = evaluator.encoding
+        evaluator.materialize(population, row)
+        day_hours = population.room_hours[row, :, encoding.date_idx[s_idx]].tolist()
+        room_class = encoding.room_class_list
+        alone = current >= 0 and abs(day_hours[current] - encoding.hours[s_idx]) < 1e-9
+        current_class = room_class[current] if current >= 0 else -1
+        
+        kept, seen_classes = [], set()
+        for r in cands.tolist():
+            if day_hours[r] == 0:
+                c = room_class[r]
+                if c in seen_classes or (alone and c == current_class):
+                    continue
+                seen_classes.add(c)
+            kept.append(r)
+        return np.array(kept, dtype=np.int64)
+
+    def _deduplicate(self, population: PopulationState, evaluator: PopulationFitness, cache: FitnessCache) -> int:
+        """重複的染色體只保留第一個，其餘隨機換房重新播種；並把本代個體寫入快取"""
+        n_surgeries = evaluator.encoding.n_surgeries
+        keys = evaluator.encoding.chromosome_keys(population.genes)
+        reseeded = 0
+        if self.GA_DEDUP and n_surgeries:
+            seen, duplicates = set(), []
+            for row, key in enumerate(keys):
+                if key in seen:
+                    duplicates.append(row)
+                seen.add(key)
+            for row in duplicates:
+                for s_idx in self.rng.integers(0, n_surgeries, size=self.RESEED_MOVES).tolist():
+                    self._random_move(population, row, s_idx, evaluator)
+            if duplicates:
+                for row, key in zip(duplicates, evaluator.encoding.chromosome_keys(population.genes[duplicates])):
+                    keys[row] = key
+            reseeded = len(duplicates)
+        for key, raw in zip(keys, evaluator.raw_scores(population).tolist()):
+            cache.put(key, raw)
+        return reseeded
+
     # ==================== Stage 2: Greedy + AHP + 救援 + 詳細原因 ====================
 
-    def _stage2_greedy_scheduling(self, surgeries, allocation):
+    def _stage2_greedy_scheduling(self, surgeries, allocation, resources=None):
+        """resources: 既有的資源占用 (閉環迭代時為其他群組已排定的結果)，None 表示從空白開始"""
         surgeries_with_score = []
         for s in surgeries:
             if s.surgery_id in allocation:
@@ -343,35 +846,38 @@ class StandaloneScheduler:
         
         results = []
         failed = []
-        resources = {'doctor': {}, 'assistant': {}, 'room': {}}
+        if resources is None:
+            resources = self._new_resources()
+        rescues_skipped = 0
+        rescue_attempts = 0
+        # 原分配房間排不進去 (而非只是延遲) 的救援次數
+        allocated_room_failures = 0
+        rescue_scans = 0
         
         for s, score in surgeries_with_score:
             original_room_id = allocation[s.surgery_id]['room_id']
             room = self.available_rooms[original_room_id]
             
-            # 1. 嘗試排入原分配房間
-            slot, reason = self._find_feasible_slot(s, room, resources)
+            # 1. 嘗試排入原分配房間 (只有這次搜尋的原因會被回報)
+            slot, diagnosis = self._find_feasible_slot(s, room, resources, diagnose=True)
             
-            is_delayed = False
-            if slot:
-                if slot['end'].hour >= 17 or slot['shift'] == 'night':
-                    is_delayed = True
+            is_delayed = bool(slot) and self._is_delayed(slot['end'], slot['shift'])
             
-            # 2. 救援機制 (Rescue)
-            if not slot or is_delayed:
-                target_end_time = slot['end'] if slot else time(23, 59)
-                alternative_rooms = [
-                    r for r in self.available_rooms.values()
-                    if r['room_type'] == s.surgery_room_type 
-                    and r['id'] != original_room_id
-                    and self._check_nurse_requirement(r, s)
-                ]
+            # 2. 救援機制 (Rescue)；超出時間預算後只救援失敗者，不再為延遲者找更早時段
+            if is_delayed and slot and self._stage2_time_up():
+                rescues_skipped += 1
+            elif not slot or is_delayed:
+                rescue_attempts += 1
+                allocated_room_failures += not slot
+                target_end = slot['end_min'] if slot else None
+                alternative_rooms = [r for r in self._eligible_rooms(s) if r['id'] != original_room_id]
                 
                 best_alt_slot = None
                 best_alt_room = None
                 
                 for alt_room in alternative_rooms:
-                    alt_slot, alt_reason = self._find_feasible_slot(s, alt_room, resources)
+                    rescue_scans += 1
+                    alt_slot, _ = self._find_feasible_slot(s, alt_room, resources)
                     
                     if alt_slot:
                         if not slot: # 救援成功
@@ -379,167 +885,157 @@ class StandaloneScheduler:
                             best_alt_room = alt_room
                             break 
                         
-                        if is_delayed and alt_slot['end'] < target_end_time: # 找到更早的
+                        if is_delayed and alt_slot['end_min'] < target_end: # 找到更早的
                             best_alt_slot = alt_slot
                             best_alt_room = alt_room
-                            target_end_time = alt_slot['end']
+                            target_end = alt_slot['end_min']
                 
                 if best_alt_slot:
                     slot = best_alt_slot
                     room = best_alt_room
                 elif is_delayed:
                     # 無法找到更早，必須使用原延遲方案，並附上原因
-                    reason = f"無更早空位(受限於: {reason})"
+                    diagnosis = diagnosis._replace(no_earlier=True)
             
             # 3. 最終結果處理
             if slot:
-                # 判斷是否為延遲手術，若有 reason (代表有前置阻礙) 則標註
-                note = ""
-                if is_delayed or "受限於" in reason:
-                     note = reason if "Success" not in reason else "延遲但成功"
-
-                res = ScheduleResult(
-                    surgery_id=s.surgery_id, room_id=room['id'], scheduled_date=s.surgery_date,
-                    start_time=slot['start'], end_time=slot['end'], cleanup_end_time=slot['cleanup'],
-                    primary_shift=slot['shift'], is_cross_shift=slot['cross'], ahp_score=score, allocation_score=0
-                )
-                # Hack: 將原因暫存於物件以便列印，雖然這欄位不在標準模型內，但 Python 允許動態屬性
-                res.delay_reason = note
-                
+                res = self._build_result(s, room, slot, score, diagnosis, is_delayed)
                 results.append(res)
                 self._update_resources(resources, s, room['id'], res)
             else:
-                s.failure_reason = reason
+                s.failure_diagnosis = diagnosis
                 failed.append(s)
-                
+        
+        self.stats['stage2'] = {
+            'rescue_attempts': rescue_attempts,
+            'allocated_room_failures': allocated_room_failures,
+            'rescue_room_scans': rescue_scans
+        }
+        if rescues_skipped:
+            self.stats['stage2']['rescues_skipped_by_budget'] = rescues_skipped
         return results, failed
 
-    def _find_feasible_slot(self, surgery: Surgery, room: Dict, resources: Dict) -> Tuple[Optional[Dict], str]:
-        search_start = 8
-        search_end = 24 if room.get('night_shift') else 16
+    def _is_delayed(self, end: time, shift: str) -> bool:
+        return end.hour >= 17 or shift == 'night'
+
+    def _build_result(self, surgery: Surgery, room: Dict, slot: Dict, score: float, diagnosis: Diagnosis,
+                      is_delayed: Optional[bool] = None) -> ScheduleResult:
+        if is_delayed is None:
+            is_delayed = self._is_delayed(slot['end'], slot['shift'])
+
+        res = ScheduleResult(
+            surgery_id=surgery.surgery_id, room_id=room['id'], scheduled_date=surgery.surgery_date,
+            start_time=slot['start'], end_time=slot['end'], cleanup_end_time=slot['cleanup'],
+            primary_shift=slot['shift'], is_cross_shift=slot['cross'], ahp_score=score, allocation_score=0
+        )
+        # Hack: 將原因暫存於物件以便列印，雖然這欄位不在標準模型內，但 Python 允許動態屬性；
+        # 只有延遲手術保留診斷旗標，文字 (delay_reason) 在整批結束時由 describe() 產生
+        res.delay_diagnosis = diagnosis if is_delayed else None
+        res.delay_reason = ""
+        return res
+
+    def _find_feasible_slot(self, surgery: Surgery, room: Dict, resources: Occupancy,
+                            diagnose: bool = False) -> Tuple[Optional[Dict], Diagnosis]:
+        """跳躍式搜尋：取班別、醫師排班與房間 / 醫師 / 助手空檔的可開始時間交集，直接取最早的 30 分鐘對齊時段。
+        結果與逐格搜尋 (_scan_slots) 相同；diagnose=True 且結果延遲或失敗時才重播逐格搜尋取得原因
+        (救援 / LNS 的候選房間不回報原因，不需重播；關閉診斷時一律不重播)。"""
+        day_start, day_end = 8 * 60, 24 * 60
+        duration = int(surgery.duration * 60)
+        starts = intersect(self._room_start_windows(room, duration), self._doctor_start_windows(surgery, duration))
+        for kind, resource_id, length in (
+            ('room', room['id'], duration + 30),
+            ('doctor', surgery.doctor_id, duration),
+            ('assistant', surgery.assistant_doctor_id, duration)
+        ):
+            if starts and resource_id:
+                starts = intersect(starts, feasible_starts(resources.busy_intervals(kind, resource_id, surgery.surgery_date), length, day_start, day_end))
+
+        start = first_aligned(starts, 30)
+        slot = self._make_slot(start, duration) if start is not None else None
+        if not (diagnose and self.DIAGNOSTICS) or (slot and not self._is_delayed(slot['end'], slot['shift'])):
+            return slot, NO_DIAGNOSIS
+        return self._scan_slots(surgery, room, resources)
+
+    def _room_start_windows(self, room: Dict, duration: int) -> List[Tuple[int, int]]:
+        """房間班別允許的開始時間 (分鐘)；無夜班的房間須在 16:00 前結束"""
+        windows = []
+        if room.get('morning_shift', False):
+            windows.append((8 * 60, 16 * 60 if room.get('night_shift') else min(16 * 60, 16 * 60 - duration + 1)))
+        if room.get('night_shift', False):
+            windows.append((16 * 60, 24 * 60))
+        if len(windows) == 2:
+            windows = [(8 * 60, 24 * 60)]
+        return [w for w in windows if w[0] < w[1]]
+
+    def _doctor_start_windows(self, surgery: Surgery, duration: int) -> List[Tuple[int, int]]:
+        """醫師排班允許的開始時間 (分鐘)，由排班日曆的可排遮罩而來"""
+        if not surgery.doctor_id:
+            return [(8 * 60, 24 * 60)]
+        return self.doctor_calendar.start_windows(surgery.doctor_id, surgery.surgery_date, duration)
+
+    def _make_slot(self, start: int, duration: int) -> Dict:
+        end = start + duration
+        return {'start': to_time(start), 'end': to_time(end), 'cleanup': to_time(end + 30),
+                'start_min': start, 'end_min': end,
+                'shift': 'morning' if start < 16 * 60 else 'night',
+                'cross': start < 16 * 60 <= end}
+
+    def _scan_slots(self, surgery: Surgery, room: Dict, resources: Occupancy) -> Tuple[Optional[Dict], Diagnosis]:
+        """逐格 (每 30 分鐘) 搜尋，並以旗標累計前方時段被拒絕的原因"""
+        # 以當日 00:00 起的分鐘數搜尋；跨午夜的結束時間為 >= 1440 的分鐘數
+        search_start = 8 * 60
+        shift_end = 16 * 60
         duration = int(surgery.duration * 60)
         cleanup = 30
         
-        last_reason = "無合適時段"
-        # 收集所有失敗原因 (Set 去重)
-        rejection_reasons = set()
+        seen = last = SlotReason.NONE
 
-        for hour in range(search_start, 24):
-            for minute in [0, 30]:
-                current_time = datetime.combine(surgery.surgery_date, time(hour, minute))
-                end_time = current_time + timedelta(minutes=duration)
-                cleanup_time = end_time + timedelta(minutes=cleanup)
-                
-                t_start, t_end = current_time.time(), end_time.time()
-                
-                # Check 1: Shift limit
-                if not self._check_shift_availability(room, surgery, t_start): continue
-                if t_end.hour >= 16 and not room.get('night_shift'):
-                     if not (t_end.hour == 16 and t_end.minute == 0): 
-                         last_reason = "超過營業時間"
-                         continue
-                
-                # Check 2: Doctor
-                is_doc_avail, doc_reason = self._check_doctor_availability_verbose(surgery, t_start, t_end)
-                if not is_doc_avail: 
-                    rejection_reasons.add(doc_reason)
-                    last_reason = doc_reason
-                    continue
-                
-                # Check 3: Resource Conflict
-                is_conflict, conflict_reason = self._check_resource_conflict_verbose(surgery, room['id'], t_start, t_end, cleanup_time.time(), resources)
-                if is_conflict: 
-                    rejection_reasons.add(conflict_reason)
-                    last_reason = conflict_reason
-                    continue
-                
-                # Success Found!
-                # 總結前面失敗的原因
-                delay_note = "Success"
-                if rejection_reasons:
-                    # 優先顯示醫師原因，因為那是不可抗力
-                    if any("醫師" in r for r in rejection_reasons):
-                        delay_note = "醫師時段衝突/無排班"
-                    elif "房間時段衝突" in rejection_reasons:
-                        delay_note = "前方時段房間已滿"
-                    else:
-                        delay_note = ",".join(list(rejection_reasons)[:2])
-                
-                return {'start': t_start, 'end': t_end, 'cleanup': cleanup_time.time(), 
-                        'shift': 'morning' if t_start.hour < 16 else 'night', 
-                        'cross': (t_start.hour < 16 and t_end.hour >= 16)}, delay_note
+        for start in range(search_start, 24 * 60, 30):
+            end = start + duration
+            
+            # Check 1: Shift limit
+            if not room.get('morning_shift' if start < shift_end else 'night_shift', False): continue
+            if end > shift_end and not room.get('night_shift'):
+                last = SlotReason.AFTER_HOURS
+                continue
+            
+            # Check 2: Doctor；Check 3: Resource Conflict
+            reason = (self._doctor_rejection(surgery, start, end)
+                      or resources.conflict(surgery, room['id'], start, end, end + cleanup))
+            if reason:
+                seen |= reason
+                last = reason
+                continue
+            
+            return self._make_slot(start, duration), Diagnosis(seen, last)
         
         # Completely Failed
-        if rejection_reasons:
-            summary = ",".join(list(rejection_reasons)[:2])
-            return None, f"{last_reason} (曾遇: {summary})"
-        return None, last_reason
-
-    def _check_resource_conflict_verbose(self, surgery, room_id, start, end, cleanup, resources):
-        date = surgery.surgery_date
-        for r in resources['room'].get(room_id, []):
-            if r['date'] == date and self._overlap(start, cleanup, r['start'], r['cleanup']): 
-                return True, "房間時段衝突"
-        
-        buffer_time = timedelta(minutes=self.DOCTOR_BUFFER_MINUTES)
-        
-        if surgery.doctor_id:
-            for r in resources['doctor'].get(surgery.doctor_id, []):
-                if r['date'] == date:
-                    busy_start = (datetime.combine(date, r['start']) - buffer_time).time()
-                    busy_end = (datetime.combine(date, r['end']) + buffer_time).time()
-                    if self._overlap(start, end, busy_start, busy_end): 
-                        return True, "醫師時段衝突"
-        
-        if surgery.assistant_doctor_id:
-            for r in resources['assistant'].get(surgery.assistant_doctor_id, []):
-                if r['date'] == date:
-                    busy_start = (datetime.combine(date, r['start']) - buffer_time).time()
-                    busy_end = (datetime.combine(date, r['end']) + buffer_time).time()
-                    if self._overlap(start, end, busy_start, busy_end): 
-                         return True, "助手時段衝突"
-                         
-        return False, ""
-
-    def _overlap(self, s1, e1, s2, e2): return not (e1 <= s2 or e2 <= s1)
+        return None, Diagnosis(seen, last)
+
+    def _new_resources(self) -> Occupancy:
+        return Occupancy(self.DOCTOR_BUFFER_MINUTES)
 
     def _update_resources(self, resources, surgery, room_id, res):
-        d = surgery.surgery_date
-        if surgery.doctor_id:
-            if surgery.doctor_id not in resources['doctor']: resources['doctor'][surgery.doctor_id] = []
-            resources['doctor'][surgery.doctor_id].append({'date': d, 'start': res.start_time, 'end': res.end_time})
-        if surgery.assistant_doctor_id:
-            if surgery.assistant_doctor_id not in resources['assistant']: resources['assistant'][surgery.assistant_doctor_id] = []
-            resources['assistant'][surgery.assistant_doctor_id].append({'date': d, 'start': res.start_time, 'end': res.end_time})
-        if room_id not in resources['room']: resources['room'][room_id] = []
-        resources['room'][room_id].append({'date': d, 'start': res.start_time, 'end': res.end_time, 'cleanup': res.cleanup_end_time})
+        resources.book_result(surgery, room_id, res)
     
-    def _check_doctor_availability_verbose(self, surgery: Surgery, start_time: time, end_time: time) -> Tuple[bool, str]:
-        if not surgery.doctor_id: return True, ""
-        available_shifts = self._get_available_shifts_for_doctor(surgery.doctor_id, surgery.surgery_date)
-        if not available_shifts: return False, "醫師當日無排班"
-        
-        start_hour = start_time.hour
-        surgery_shift = 'morning' if 8 <= start_hour < 16 else ('night' if 16 <= start_hour < 24 else 'graveyard')
-        
-        if surgery_shift not in available_shifts: return False, f"醫師無{surgery_shift}班"
-        if start_hour < 16 and end_time.hour >= 16:
-             if not ('morning' in available_shifts and 'night' in available_shifts):
-                 return False, "跨班但醫師缺班"
-        return True, ""
+    def _doctor_rejection(self, surgery: Surgery, start: int, end: int) -> int:
+        """start / end 為分鐘數；可排與否只查排班日曆遮罩，不可排時才判斷原因"""
+        if not surgery.doctor_id or self.doctor_calendar.allows(surgery.doctor_id, surgery.surgery_date, start, end):
+            return SlotReason.NONE
+        available_shifts = self.doctor_calendar.shifts(surgery.doctor_id, surgery.surgery_date)
+        if not available_shifts: return SlotReason.DOCTOR_NO_SCHEDULE
+        if start < 16 * 60:
+            return SlotReason.DOCTOR_NO_MORNING if 'morning' not in available_shifts else SlotReason.DOCTOR_CROSS_SHIFT
+        return SlotReason.DOCTOR_NO_NIGHT
     
     def _check_doctor_availability(self, surgery, start, end):
-        res, _ = self._check_doctor_availability_verbose(surgery, start, end)
-        return res
+        return not self._doctor_rejection(surgery, start, end)
 
     def _get_doctor_schedule_type(self, doctor_id: str, surgery_date: date) -> Optional[str]:
-        if doctor_id not in self.doctor_schedules: return 'A'
-        weekday_map = {0: 'monday', 1: 'tuesday', 2: 'wednesday', 3: 'thursday', 4: 'friday', 5: 'saturday', 6: 'sunday'}
-        return self.doctor_schedules[doctor_id].get(weekday_map.get(surgery_date.weekday()), 'A')
+        return self.doctor_calendar.schedule_type(doctor_id, surgery_date)
 
     def _get_available_shifts_for_doctor(self, doctor_id: str, surgery_date: date) -> List[str]:
-        stype = self._get_doctor_schedule_type(doctor_id, surgery_date)
-        return self.DOCTOR_SCHEDULE_TYPES.get(stype, {}).get('available_shifts', ['morning', 'night'])
+        return self.doctor_calendar.shifts(doctor_id, surgery_date)
 
     def _calculate_ahp_score(self, surgery): return (1/(1+surgery.duration))*0.4 + 0.5*0.3 + 0.8*0.2
 
@@ -552,8 +1048,9 @@ class StandaloneScheduler:
         print(f"{'手術ID':<12} | {'日期':<10} | {'需求人數':<4} | {'分配房間':<8} | {'房內人數':<4}")
         print("-" * 60)
         sorted_alloc = sorted(allocation.items(), key=lambda x: x[0])
+        surgery_index = self._index_surgeries(surgeries)
         for s_id, alloc in sorted_alloc:
-            s = next((x for x in surgeries if x.surgery_id == s_id), None)
+            s = surgery_index.get(s_id)
             if not s: continue
             room_id = alloc.get('room_id', 'N/A')
             room = self.available_rooms.get(room_id)
@@ -566,8 +1063,9 @@ class StandaloneScheduler:
         print(f"{'日期':<12} | {'開啟房間數':<10} | {'平均時數(hr)':<12}")
         print("-" * 50)
         daily_data = {} 
+        surgery_index = self._index_surgeries(surgeries)
         for s_id, alloc in allocation.items():
-            s = next((x for x in surgeries if x.surgery_id == s_id), None)
+            s = surgery_index.get(s_id)
             if not s: continue
             d_str = str(s.surgery_date)
             if d_str not in daily_data: daily_data[d_str] = {'rooms': set(), 'total_hours': 0.0}
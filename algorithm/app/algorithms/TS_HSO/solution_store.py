@@ -0,0 +1,58 @@
+"""
+solution_store.py - 前次排程解的暫存 (warm start)
+以「日期區間 + 手術室集合」為鍵保存 {surgery_id: room_id}，同一區間重新排程時
+可從上一次的最佳分配出發。預設只存在行程記憶體中，指定 path 時另寫入 JSON 檔
+(path 來自伺服器設定 WARM_START_PATH，不接受請求參數)。
+"""
+
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Iterable, Optional
+import json
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# 行程內共用的記憶體暫存 (API 每次請求都會建立新的排程器)
+_MEMORY: 'OrderedDict[str, Dict[str, str]]' = OrderedDict()
+
+
+def solution_key(dates: Iterable[date], room_ids: Iterable[str]) -> str:
+    dates = sorted(dates)
+    window = f"{dates[0].isoformat()}~{dates[-1].isoformat()}" if dates else "-"
+    return f"{window}|{','.join(sorted(room_ids))}"
+
+
+class SolutionStore:
+    """有上限的 LRU 解暫存；path 不為 None 時同步讀寫 JSON 檔"""
+
+    def __init__(self, path: Optional[str] = None, maxsize: int = 64):
+        self.path = path
+        self.maxsize = max(1, int(maxsize))
+        self._data = _MEMORY
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    for key, solution in json.load(f).items():
+                        self._data.setdefault(key, solution)
+            except (OSError, ValueError) as e:
+                logger.warning(f"讀取 warm start 檔案失敗 ({path}): {e}")
+
+    def get(self, key: str) -> Optional[Dict[str, str]]:
+        solution = self._data.get(key)
+        if solution is not None:
+            self._data.move_to_end(key)
+        return solution
+
+    def put(self, key: str, solution: Dict[str, str]):
+        self._data[key] = dict(solution)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+        if self.path:
+            try:
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    json.dump(self._data, f, ensure_ascii=False)
+            except OSError as e:
+                logger.warning(f"寫入 warm start 檔案失敗 ({self.path}): {e}")
@@ -0,0 +1,97 @@
+"""
+tabu_search.py - Stage 1 禁忌搜尋
+單一軌跡在「單台手術換房」與「同日兩台手術互換房間」兩種鄰域上移動，
+以 PopulationFitness 的增量計算評分；禁忌表以 (手術, 手術室) 為鍵，
+禁止手術在 tenure 次迭代內搬回剛離開的房間，除非能刷新最佳解 (aspiration)。
+"""
+
+from typing import Dict, Tuple
+import numpy as np
+
+from .encoding import UNASSIGNED
+from .local_search import Neighbourhood, swap_delta
+from .population_fitness import PopulationFitness
+
+
+def run_tabu_search(scheduler, evaluator: PopulationFitness, initial_genes: np.ndarray) -> Tuple[np.ndarray, float]:
+    """執行禁忌搜尋，回傳 (最佳基因, 最佳適應度)；統計寫入 scheduler.stats"""
+    encoding = evaluator.encoding
+    rng = scheduler.rng
+    tenure = max(1, int(scheduler.TABU_TENURE))
+    neighbourhood = max(1, int(scheduler.TABU_NEIGHBOURHOOD))
+
+    state = evaluator.build_state(np.atleast_2d(initial_genes).copy())
+    current = float(evaluator.raw_scores(state)[0])
+    best_genes, best_raw = state.genes[0].copy(), current
+
+    neighbours = Neighbourhood(encoding)
+    movable = neighbours.movable
+
+    tabu: Dict[Tuple[int, int], int] = {}
+    iterations = evaluations = no_improvement = 0
+    stop_reason = 'iterations'
+
+    for iteration in range(int(scheduler.TABU_ITERATIONS) if movable else 0):
+        genes = state.genes[0]
+        best_move, best_delta = None, -np.inf
+
+        for _ in range(neighbourhood):
+            a = movable[rng.integers(len(movable))]
+            room_a = int(genes[a])
+            if room_a != UNASSIGNED and rng.random() < scheduler.TABU_SWAP_RATE:
+                # 互換：同日另一台手術，雙方都能進入對方的房間
+                b = neighbours.swap_partner(genes, a, rng)
+                if b == UNASSIGNED:
+                    continue
+                move = ((a, int(genes[b])), (b, room_a))
+                delta = swap_delta(evaluator, state, 0, a, b)
+            else:
+                cands = encoding.candidates[a]
+                room = int(cands[rng.integers(len(cands))])
+                if room == room_a:
+                    continue
+                move = ((a, room),)
+                delta = evaluator.move_delta(state, 0, a, room)
+            evaluations += 1
+
+            is_tabu = any(tabu.get(key, -1) > iteration for key in move)
+            if is_tabu and current + delta <= best_raw + 1e-9:
+                continue
+            if delta > best_delta:
+                best_move, best_delta = move, delta
+
+        iterations = iteration + 1
+        if best_move is None:
+            no_improvement += 1
+        else:
+            for s, room in best_move:
+                tabu[(s, int(genes[s]))] = iteration + tenure
+                evaluator.apply_move(state, 0, s, room)
+            current += best_delta
+            if current > best_raw + 1e-9:
+                best_genes, best_raw = state.genes[0].copy(), current
+                no_improvement = 0
+            else:
+                no_improvement += 1
+
+        best_fitness = max(best_raw, 0.0)
+        if scheduler._reached_upper_bound(best_fitness):
+            stop_reason = 'optimal'
+            break
+        if no_improvement >= scheduler.TABU_PATIENCE:
+            stop_reason = 'converged'
+            break
+        if scheduler._stage1_time_up():
+            stop_reason = 'time_budget'
+            break
+
+    best_fitness = float(evaluator.evaluate(best_genes)[0])
+    print(f"    ✓ 禁忌搜尋 {iterations} 次迭代 ({stop_reason}), Fitness={best_fitness:.2f}")
+    scheduler.stats['stage1'] = {
+        'engine': 'tabu',
+        'iterations': iterations,
+        'evaluations': evaluations,
+        'best_fitness': round(best_fitness, 2),
+        'stop_reason': stop_reason
+    }
+    return best_genes, best_fitness
@@ -147,6 +147,7 @@ async def trigger_scheduling(request: SchedulingRequest):
             'success_rate': (len(results) / len(surgeries) * 100) if surgeries else 0,
             'utilization_rate': scheduler.calculate_utilization()
         }
+        statistics.update(scheduler.stats)
         
         return SchedulingResponse(
             success=True,
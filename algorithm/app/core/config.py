@@ -10,6 +10,20 @@ Manages:
 - Service settings
 """
 
-# TODO: Define configuration class
-# TODO: Load from .env file
+from typing import Optional
+
+from pydantic_settings import BaseSettings, SettingsConfigDict
+
 # TODO: Validate configuration values
+
+
+class Settings(BaseSettings):
+    """Server-side settings, read from the environment or .env"""
+
+    model_config = SettingsConfigDict(env_file='.env', extra='ignore')
+
+    # TS-HSO warm start 解暫存的 JSON 檔；只由伺服器設定，排程請求的 config 不能指定檔案路徑
+    warm_start_path: Optional[str] = None
+
+
+settings = Settings()
@@ -0,0 +1,160 @@
+"""
+benchmark_modes.py - 比較 preview / standard / thorough 三種排程模式的延遲與品質
+
+以固定亂數種子產生合成資料 (12 間 RSU/RE 手術室)，每種模式各跑數個種子，輸出中位數延遲、
+平均成功 / 失敗 / 延遲台數、Stage 1 的最佳適應度 (stats['stage1']['best_fitness'])、適應度上界與
+最佳性差距 (只建構啟發式的 preview 沒有這些值，以 - 表示)，以及 Stage 2 的救援次數 (rescues) 與
+Stage 1 分配的手術室排不進的台數 (room fails)。
+
+情境 (--scenario):
+    realistic  一般負載 (預設)：每日約 22 台，醫師多半當日一台，少數 B/C 班
+    stress     壓力情境：醫師同日多台且分散多房、含 D/E 班，部分日期超額；適應度常被壓到 0
+
+用法 (於 algorithm/ 目錄):
+    python -m benchmarks.benchmark_modes --sizes 50 200 500 --seeds 3
+    python -m benchmarks.benchmark_modes --scenario stress
+    python -m benchmarks.benchmark_modes --modes standard --config '{"doctor_aware_fitness": false}'
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import random
+import statistics
+import sys
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.models.scheduling import Surgery  # noqa: E402
+from app.algorithms.TS_HSO.scheduler_standalone import StandaloneScheduler, MODE_PRESETS  # noqa: E402
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+
+
+def make_stress_problem(n: int, seed: int):
+    """壓力情境：醫師隨機分到任意日期 (同日常有多台、分散多房)，含 D/E 班醫師，部分日期超額"""
+    rnd = random.Random(seed)
+    n_days = max(1, n // 25)
+    n_doctors = max(10, n // 2)
+    rooms = [
+        {
+            'id': f'R{i:02d}', 'room_type': 'RSU' if i < 8 else 'RE', 'nurse_count': rnd.choice([2, 3]),
+            'morning_shift': True, 'night_shift': i % 3 != 0, 'graveyard_shift': False
+        }
+        for i in range(12)
+    ]
+    start = date(2026, 1, 5)
+    surgeries = [
+        Surgery(
+            surgery_id=f'S{k:04d}', doctor_id=f'D{rnd.randrange(n_doctors)}',
+            assistant_doctor_id=rnd.choice([None, f'A{rnd.randrange(10)}']), surgery_type_code='X',
+            patient_id=k, surgery_room_type=rnd.choice(['RSU', 'RSU', 'RE']),
+            surgery_date=start + timedelta(days=rnd.randrange(n_days)),
+            duration=rnd.choice([0.5, 1, 1.5, 2, 2.5, 3, 4]), nurse_count=rnd.choice([2, 3, 3])
+        )
+        for k in range(n)
+    ]
+    doctor_schedules = {
+        f'D{i}': {day: rnd.choice('AAAAAABCDE') for day in WEEKDAYS} for i in range(0, n_doctors, 2)
+    }
+    return surgeries, rooms, doctor_schedules
+
+
+def make_realistic_problem(n: int, seed: int):
+    """
+    一般負載情境：每日約 22 台 (約早班容量的 75%)，3 人手術室的容量與 3 人手術的比例相當；
+    醫師多半當日只有一台，少數排第二台 (當日合計不超過 7h)；醫師約 1/22 為 B 班、1/22 為 C 班，沒有 D/E 班
+    """
+    rnd = random.Random(seed)
+    n_days = max(1, round(n / 22))
+    rooms = [
+        {
+            'id': f'R{i:02d}', 'room_type': 'RSU' if i < 8 else 'RE', 'nurse_count': 3 if i in (1, 4, 6, 9, 10) else 2,
+            'morning_shift': True, 'night_shift': i % 3 != 0, 'graveyard_shift': False
+        }
+        for i in range(12)
+    ]
+    start = date(2026, 1, 5)
+    surgeries = []
+    doctor_hours: Dict[Tuple[int, str], float] = {}
+    for k in range(n):
+        day = k % n_days
+        duration = rnd.choice([1, 1.5, 2, 2.5, 3, 3.5, 4, 5])
+        same_day = [d for (dd, d), h in doctor_hours.items() if dd == day and h + duration <= 7]
+        if same_day and rnd.random() < 0.04:
+            doctor_id = rnd.choice(same_day)
+        else:
+            doctor_id = f'D{len(doctor_hours)}'
+        doctor_hours[day, doctor_id] = doctor_hours.get((day, doctor_id), 0.0) + duration
+        surgeries.append(Surgery(
+            surgery_id=f'S{k:04d}', doctor_id=doctor_id, assistant_doctor_id=None, surgery_type_code='X',
+            patient_id=k, surgery_room_type=rnd.choice(['RSU', 'RSU', 'RE']),
+            surgery_date=start + timedelta(days=day), duration=duration, nurse_count=3 if rnd.random() < 0.2 else 2
+        ))
+    doctor_schedules = {
+        doctor_id: {weekday: rnd.choice('A' * 20 + 'BC') for weekday in WEEKDAYS} for _, doctor_id in doctor_hours
+    }
+    return surgeries, rooms, doctor_schedules
+
+
+SCENARIOS = {'realistic': make_realistic_problem, 'stress': make_stress_problem}
+
+
+def run(mode: str, n: int, seed: int, scenario: str = 'realistic', config: Optional[Dict] = None):
+    surgeries, rooms, doctor_schedules = SCENARIOS[scenario](n, seed)
+    with contextlib.redirect_stdout(io.StringIO()):
+        scheduler = StandaloneScheduler(
+            rooms, [], dict({'mode': mode, 'random_seed': seed}, **(config or {})), doctor_schedules
+        )
+        started = time.perf_counter()
+        results, failed = scheduler.schedule(surgeries)
+        elapsed = (time.perf_counter() - started) * 1000
+    delayed = sum(1 for r in results if scheduler._is_delayed(r.end_time, r.primary_shift))
+    optimality = scheduler.stats.get('optimality', {})
+    return (
+        elapsed, len(results), len(failed), delayed, scheduler.stats.get('stage1', {}).get('best_fitness'),
+        optimality.get('fitness_upper_bound'), optimality.get('gap_pct'),
+        scheduler.stats.get('stage2', {}).get('rescue_attempts', 0),
+        scheduler.stats.get('stage2', {}).get('allocated_room_failures', 0)
+    )
+
+
+def _mean(values) -> str:
+    values = [v for v in values if v is not None]
+    return f"{statistics.mean(values):.1f}" if values else "-"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[50, 200, 500])
+    parser.add_argument('--seeds', type=int, default=3)
+    parser.add_argument('--modes', nargs='+', default=list(MODE_PRESETS))
+    parser.add_argument('--scenario', choices=list(SCENARIOS), default='realistic')
+    parser.add_argument('--config', type=json.loads, default={}, help='覆寫模式預設的 config (JSON)')
+    args = parser.parse_args()
+    logging.disable(logging.CRITICAL)
+
+    print(
+        f"{'mode':<10} {'n':>5} {'p50 ms':>9} {'max ms':>9} {'scheduled':>10} {'failed':>7} {'delayed':>8} "
+        f"{'fitness':>8} {'bound':>8} {'gap %':>6} {'rescues':>8} {'room fails':>10}"
+    )
+    for n in args.sizes:
+        for mode in args.modes:
+            runs = [run(mode, n, seed, args.scenario, args.config) for seed in range(args.seeds)]
+            times = [r[0] for r in runs]
+            print(
+                f"{mode:<10} {n:>5} {statistics.median(times):>9.1f} {max(times):>9.1f} "
+                f"{statistics.mean(r[1] for r in runs):>10.1f} {statistics.mean(r[2] for r in runs):>7.1f} "
+                f"{statistics.mean(r[3] for r in runs):>8.1f} {_mean(r[4] for r in runs):>8} "
+                f"{_mean(r[5] for r in runs):>8} {_mean(r[6] for r in runs):>6} {_mean(r[7] for r in runs):>8} {_mean(r[8] for r in runs):>10}"
+            )
+
+
+if __name__ == '__main__':
+    main()
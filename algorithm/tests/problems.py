@@ -0,0 +1,43 @@
+"""
+測試用的合成排程資料 (固定亂數種子)
+"""
+
+import random
+from datetime import date, timedelta
+
+from app.models.scheduling import Surgery
+
+WEEKDAYS = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+MONDAY = date(2026, 1, 5)
+
+
+def make_problem(n: int, seed: int, n_rooms: int = 12):
+    """
+    n 台手術、n_rooms 間 RSU / RE 手術室 (部分沒有夜班)，每日約 25 台；
+    偶數編號醫師有排班 (含 B / C / D / E 班)，奇數編號醫師未列出 (視為 A 班)
+    """
+    rnd = random.Random(seed)
+    n_days = max(1, n // 25)
+    n_doctors = max(10, n // 2)
+    rooms = [
+        {
+            'id': f'R{i:02d}', 'room_type': 'RSU' if i < n_rooms * 2 // 3 else 'RE',
+            'nurse_count': rnd.choice([2, 3]), 'morning_shift': True, 'night_shift': i % 3 != 0,
+            'graveyard_shift': False
+        }
+        for i in range(n_rooms)
+    ]
+    surgeries = [
+        Surgery(
+            surgery_id=f'S{k:04d}', doctor_id=f'D{rnd.randrange(n_doctors)}',
+            assistant_doctor_id=rnd.choice([None, f'A{rnd.randrange(10)}']), surgery_type_code='X',
+            patient_id=k, surgery_room_type=rnd.choice(['RSU', 'RSU', 'RE']),
+            surgery_date=MONDAY + timedelta(days=rnd.randrange(n_days)),
+            duration=rnd.choice([0.5, 1, 1.5, 2, 2.5, 3, 4]), nurse_count=rnd.choice([2, 3, 3])
+        )
+        for k in range(n)
+    ]
+    doctor_schedules = {
+        f'D{i}': {day: rnd.choice('AAAAAABCDE') for day in WEEKDAYS} for i in range(0, n_doctors, 2)
+    }
+    return surgeries, rooms, doctor_schedules
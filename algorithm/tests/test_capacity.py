@@ -0,0 +1,62 @@
+"""
+capacity_report 依 (房型, 護理人數) 資格類別比較需求與容量；
+capacity_fast_exit 只剔除放不下的手術 (長手術先)，其餘照常排程。
+"""
+
+from datetime import date
+
+from app.models.scheduling import Surgery
+from app.algorithms.TS_HSO.capacity import capacity_report, trim_overbooked
+from app.algorithms.TS_HSO.prevalidation import CAPACITY_EXCEEDED
+from app.algorithms.TS_HSO.scheduler_standalone import StandaloneScheduler
+
+MONDAY = date(2026, 1, 5)
+ROOMS = [
+    {'id': 'R2', 'room_type': 'RSU', 'nurse_count': 2, 'morning_shift': True, 'night_shift': False},
+    {'id': 'R3', 'room_type': 'RSU', 'nurse_count': 3, 'morning_shift': True, 'night_shift': False},
+]
+
+
+def _surgery(k, duration, nurse_count, doctor_id=None):
+    return Surgery(f'S{k}', doctor_id or f'D{k}', None, 'X', k, 'RSU', MONDAY, duration, nurse_count)
+
+
+def _scheduler(**config):
+    return StandaloneScheduler(ROOMS, [], dict({'verbose': False, 'random_seed': 0}, **config))
+
+
+def test_report_checks_each_nurse_count_class():
+    """3 人手術只能用 R3：12h 超過 8h；2 人手術可用兩間，合計 12h 不超過 16h"""
+    surgeries = [_surgery(0, 3.5, 3), _surgery(1, 3.5, 3), _surgery(2, 3.5, 3)]
+    entry = capacity_report(_scheduler(), surgeries)[str(MONDAY)]
+    by_nurse_count = entry['room_types']['RSU']['by_nurse_count']
+    assert entry['overbooked']
+    assert by_nurse_count['3']['rooms'] == ['R3']
+    assert by_nurse_count['3']['requested_hours'] == 12.0
+    assert by_nurse_count['3']['capacity_hours'] == 8.0
+    assert by_nurse_count['3']['overflow_hours'] == 4.0
+
+    surgeries = [_surgery(k, 3.5, 2) for k in range(3)]
+    assert not capacity_report(_scheduler(), surgeries)[str(MONDAY)]['overbooked']
+
+
+def test_report_lists_doctors_over_their_shift_hours():
+    scheduler = StandaloneScheduler(ROOMS, [], {'verbose': False}, {'DC': {'monday': 'C'}})
+    surgeries = [_surgery(0, 4, 2, 'DC'), _surgery(1, 4, 2, 'DC')]
+    doctors = capacity_report(scheduler, surgeries)[str(MONDAY)]['doctors']
+    assert doctors == {'DC': {'schedule_type': 'C', 'requested_hours': 8.5, 'available_hours': 8.0}}
+
+
+def test_trim_drops_only_what_does_not_fit():
+    """3 人類別 12.5h 對 8h：先剔除最長的 4h，其餘 (含 2 人手術) 保留"""
+    surgeries = [_surgery(0, 1.5, 3), _surgery(1, 4, 3), _surgery(2, 2.5, 3), _surgery(3, 2, 2)]
+    kept, dropped = trim_overbooked(_scheduler(), surgeries)
+    assert [s.surgery_id for s in dropped] == ['S1']
+    assert [s.surgery_id for s in kept] == ['S0', 'S2', 'S3']
+
+
+def test_fast_exit_schedules_the_rest_of_an_overbooked_class():
+    surgeries = [_surgery(k, 3.5, 3) for k in range(3)] + [_surgery(3, 2, 2)]
+    results, failed = _scheduler(capacity_fast_exit=True).schedule(surgeries)
+    assert [s.failure_code for s in failed] == [CAPACITY_EXCEEDED]
+    assert sorted(r.surgery_id for r in results) == ['S1', 'S2', 'S3']
@@ -0,0 +1,73 @@
+"""
+DoctorCalendar 必須與原本逐次查表的醫師排班規則相同 (未跨午夜的時段)，
+並涵蓋未列出的醫師、缺少的星期與未知班別代碼。
+"""
+
+from datetime import date, timedelta
+
+import pytest
+
+from app.algorithms.TS_HSO.scheduler_standalone import StandaloneScheduler
+
+DOCTOR_SCHEDULES = {
+    'DA': {'monday': 'A'},
+    'DB': {'monday': 'B'},
+    'DC': {'monday': 'C'},
+    'DD': {'monday': 'D'},
+    'DE': {'monday': 'E'},
+    'DZ': {'monday': 'Z'},   # 未知代碼：早晚班皆可
+    'DN': {},                # 缺少星期：視為 A 班
+}
+DOCTORS = list(DOCTOR_SCHEDULES) + ['D_UNLISTED']
+MONDAY = date(2026, 1, 5)
+
+
+def _legacy_shifts(scheduler, doctor_id, day):
+    weekday = ('monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday')[day.weekday()]
+    stype = DOCTOR_SCHEDULES[doctor_id].get(weekday, 'A') if doctor_id in DOCTOR_SCHEDULES else 'A'
+    return scheduler.DOCTOR_SCHEDULE_TYPES.get(stype, {}).get('available_shifts', ['morning', 'night'])
+
+
+def _legacy_allows(shifts, start, end):
+    """原本的 _check_doctor_availability_verbose (start / end 為當日分鐘數，end < 24:00)"""
+    if not shifts:
+        return False
+    start_hour, end_hour = start // 60, end // 60
+    if ('morning' if 8 <= start_hour < 16 else 'night') not in shifts:
+        return False
+    if start_hour < 16 and end_hour >= 16:
+        return 'morning' in shifts and 'night' in shifts
+    return True
+
+
+@pytest.fixture(scope='module')
+def scheduler():
+    return StandaloneScheduler([], [], {'verbose': False}, DOCTOR_SCHEDULES)
+
+
+@pytest.mark.parametrize('doctor_id', DOCTORS)
+@pytest.mark.parametrize('day', [MONDAY, MONDAY + timedelta(days=1)])
+def test_calendar_matches_legacy_rules(scheduler, doctor_id, day):
+    calendar = scheduler.doctor_calendar
+    shifts = _legacy_shifts(scheduler, doctor_id, day)
+    assert calendar.shifts(doctor_id, day) == shifts
+    for start in range(8 * 60, 24 * 60, 30):
+        for duration in range(0, 24 * 60 - start, 15):
+            end = start + duration
+            assert calendar.allows(doctor_id, day, start, end) == _legacy_allows(shifts, start, end), (start, end)
+
+
+@pytest.mark.parametrize('doctor_id', DOCTORS)
+def test_start_windows_agree_with_allows(scheduler, doctor_id):
+    calendar = scheduler.doctor_calendar
+    for duration in (30, 120, 450, 480, 600):
+        windows = calendar.start_windows(doctor_id, MONDAY, duration)
+        for start in range(8 * 60, 24 * 60, 30):
+            in_window = any(lo <= start < hi for lo, hi in windows)
+            assert in_window == calendar.allows(doctor_id, MONDAY, start, start + duration), (duration, start)
+
+
+def test_night_surgery_may_cross_midnight(scheduler):
+    calendar = scheduler.doctor_calendar
+    assert calendar.allows('DB', MONDAY, 23 * 60, 25 * 60)
+    assert not calendar.allows('DC', MONDAY, 15 * 60, 25 * 60)
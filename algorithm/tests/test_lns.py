@@ -0,0 +1,28 @@
+"""
+LNS 只接受使 (成功台數, -延遲台數, -結束時間總和) 嚴格改善的重建，
+且每台手術不是排入就是失敗，不會遺失或重複。
+"""
+
+import pytest
+
+from app.algorithms.TS_HSO.lns import _objective, run_lns
+from app.algorithms.TS_HSO.scheduler_standalone import StandaloneScheduler
+from tests.problems import make_problem
+
+
+@pytest.mark.parametrize('n, seed', [(60, 0), (150, 1), (150, 2)])
+def test_objective_never_decreases(n, seed):
+    surgeries, rooms, doctor_schedules = make_problem(n, seed)
+    config = {'verbose': False, 'random_seed': seed, 'lns_iterations': 60, 'lns_time_ms': 5000}
+    scheduler = StandaloneScheduler(rooms, [], config, doctor_schedules)
+    results, failed = scheduler._stage2_greedy_scheduling(surgeries, scheduler._constructive_heuristic(surgeries))
+    before = _objective(scheduler, results)
+
+    results, failed = run_lns(scheduler, surgeries, results, failed)
+
+    stats = scheduler.stats['lns']
+    assert _objective(scheduler, results) >= before
+    assert stats['accepted'] == 0 or _objective(scheduler, results) > before
+    assert stats['scheduled_after'] >= stats['scheduled_before']
+    ids = [r.surgery_id for r in results] + [s.surgery_id for s in failed]
+    assert sorted(ids) == sorted(s.surgery_id for s in surgeries)
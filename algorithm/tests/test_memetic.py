@@ -0,0 +1,27 @@
+"""
+memetic 局部搜尋的計數在島嶼模型下由各島工作行程帶回主行程加總。
+"""
+
+from app.algorithms.TS_HSO.scheduler_standalone import StandaloneScheduler
+from tests.problems import make_problem
+
+
+def _memetic_stats(**config):
+    surgeries, rooms, doctor_schedules = make_problem(60, 0)
+    config = dict(
+        {'verbose': False, 'random_seed': 0, 'ga_memetic': True, 'ga_population': 20, 'ga_generations': 6}, **config
+    )
+    scheduler = StandaloneScheduler(rooms, [], config, doctor_schedules)
+    scheduler.schedule(surgeries)
+    return scheduler.stats.get('memetic')
+
+
+def test_single_population_counts():
+    stats = _memetic_stats()
+    assert stats['polished'] > 0 and stats['evaluations'] > 0
+
+
+def test_island_counts_are_summed():
+    stats = _memetic_stats(ga_islands=2, ga_island_workers=1, ga_migration_interval=3)
+    assert stats is not None
+    assert stats['polished'] > 0 and stats['evaluations'] > 0
@@ -0,0 +1,49 @@
+"""
+prevalidate 在搜尋前以失敗代碼剔除注定失敗的手術，其餘照常排程。
+"""
+
+from datetime import date
+
+from app.models.scheduling import Surgery
+from app.algorithms.TS_HSO.prevalidation import (
+    DOCTOR_UNAVAILABLE, FAILURE_REASONS, INSUFFICIENT_NURSES, NO_ROOM_TYPE, prevalidate
+)
+from app.algorithms.TS_HSO.scheduler_standalone import StandaloneScheduler
+
+MONDAY = date(2026, 1, 5)
+ROOMS = [{'id': 'R0', 'room_type': 'RSU', 'nurse_count': 2, 'morning_shift': True, 'night_shift': True}]
+DOCTOR_SCHEDULES = {'DD': {'monday': 'D'}, 'DE': {'monday': 'E'}, 'DB': {'monday': 'B'}}
+
+
+def _surgery(surgery_id, doctor_id='D0', room_type='RSU', nurse_count=2):
+    return Surgery(surgery_id, doctor_id, None, 'X', 1, room_type, MONDAY, 2.0, nurse_count)
+
+
+def _scheduler(**config):
+    return StandaloneScheduler(ROOMS, [], dict({'verbose': False, 'random_seed': 0}, **config), DOCTOR_SCHEDULES)
+
+
+def _surgeries():
+    return [
+        _surgery('OK'), _surgery('NIGHT', 'DB'), _surgery('RE', room_type='RE'),
+        _surgery('N3', nurse_count=3), _surgery('CLINIC', 'DD'), _surgery('LEAVE', 'DE'),
+    ]
+
+
+def test_codes_for_each_reason():
+    scheduler = _scheduler()
+    valid, rejected = prevalidate(scheduler, _surgeries())
+    assert [s.surgery_id for s in valid] == ['OK', 'NIGHT']
+    assert {s.surgery_id: s.failure_code for s in rejected} == {
+        'RE': NO_ROOM_TYPE, 'N3': INSUFFICIENT_NURSES, 'CLINIC': DOCTOR_UNAVAILABLE, 'LEAVE': DOCTOR_UNAVAILABLE
+    }
+    assert all(s.failure_reason == FAILURE_REASONS[s.failure_code] for s in rejected)
+    assert scheduler.stats['prevalidation']['by_code'] == {
+        NO_ROOM_TYPE: 1, INSUFFICIENT_NURSES: 1, DOCTOR_UNAVAILABLE: 2
+    }
+
+
+def test_schedule_reports_rejected_and_places_the_rest():
+    results, failed = _scheduler().schedule(_surgeries())
+    assert sorted(r.surgery_id for r in results) == ['NIGHT', 'OK']
+    assert sorted(s.surgery_id for s in failed) == ['CLINIC', 'LEAVE', 'N3', 'RE']
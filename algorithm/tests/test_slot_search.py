@@ -0,0 +1,42 @@
+"""
+Stage 2 跳躍式時段搜尋 (_find_feasible_slot) 必須與逐格搜尋 (_scan_slots) 找到同一個時段，
+且 diagnose=True 時回報逐格搜尋的原因。
+"""
+
+import random
+
+import pytest
+
+from app.algorithms.TS_HSO.scheduler_standalone import StandaloneScheduler
+from app.algorithms.TS_HSO.diagnostics import NO_DIAGNOSIS
+from tests.problems import make_problem
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_jump_search_matches_grid_walk(seed):
+    surgeries, rooms, doctor_schedules = make_problem(150, seed)
+    rnd = random.Random(seed)
+    for s in surgeries:
+        # 加入長手術 (跨 16:00 與跨午夜) 與不對齊 30 分鐘的時長 (91 分鐘時可行區間邊界與格點只差 1 分鐘)
+        if rnd.random() < 0.4:
+            s.duration = rnd.choice([0.75, 91 / 60, 2.2, 3.4, 6, 7.5, 9, 10.5])
+    scheduler = StandaloneScheduler(rooms, [], {'verbose': False}, doctor_schedules)
+    resources = scheduler._new_resources()
+
+    for s in surgeries:
+        booked = False
+        for room in scheduler._eligible_rooms(s):
+            slot, diagnosis = scheduler._find_feasible_slot(s, room, resources)
+            expected_slot, expected_diagnosis = scheduler._scan_slots(s, room, resources)
+            assert slot == expected_slot
+            assert diagnosis == NO_DIAGNOSIS
+
+            slot, diagnosis = scheduler._find_feasible_slot(s, room, resources, diagnose=True)
+            assert slot == expected_slot
+            if slot is None or scheduler._is_delayed(slot['end'], slot['shift']):
+                assert diagnosis == expected_diagnosis
+
+            if slot and not booked:
+                res = scheduler._build_result(s, room, slot, 0.0, diagnosis)
+                scheduler._update_resources(resources, s, room['id'], res)
+                booked = True
@@ -0,0 +1,70 @@
+"""
+SolutionStore 以 (日期區間, 手術室集合) 為鍵保存前次分配；檔案路徑只來自伺服器設定。
+"""
+
+from collections import OrderedDict
+from datetime import date
+
+import pytest
+
+from app.core.config import settings
+from app.models.scheduling import Surgery
+from app.algorithms.TS_HSO import scheduler_standalone, solution_store
+from app.algorithms.TS_HSO.solution_store import SolutionStore, solution_key
+
+MONDAY, TUESDAY = date(2026, 1, 5), date(2026, 1, 6)
+ROOMS = [
+    {'id': f'R{i}', 'room_type': 'RSU', 'nurse_count': 2, 'morning_shift': True, 'night_shift': True}
+    for i in range(3)
+]
+
+
+@pytest.fixture(autouse=True)
+def empty_memory(monkeypatch):
+    monkeypatch.setattr(solution_store, '_MEMORY', OrderedDict())
+
+
+def test_key_ignores_order():
+    assert solution_key([TUESDAY, MONDAY], ['R1', 'R0']) == solution_key([MONDAY, TUESDAY], ['R0', 'R1'])
+    assert solution_key([MONDAY], ['R0']) != solution_key([MONDAY], ['R0', 'R1'])
+
+
+def test_lru_evicts_least_recently_used():
+    store = SolutionStore(maxsize=2)
+    store.put('a', {'S1': 'R0'})
+    store.put('b', {'S1': 'R1'})
+    store.get('a')
+    store.put('c', {'S1': 'R2'})
+    assert store.get('b') is None
+    assert store.get('a') == {'S1': 'R0'}
+    assert store.get('c') == {'S1': 'R2'}
+
+
+def test_file_round_trip(tmp_path, monkeypatch):
+    path = str(tmp_path / 'warm.json')
+    SolutionStore(path).put('a', {'S1': 'R0'})
+    monkeypatch.setattr(solution_store, '_MEMORY', OrderedDict())
+    assert SolutionStore(path).get('a') == {'S1': 'R0'}
+
+
+def test_request_config_cannot_choose_the_file(tmp_path, monkeypatch):
+    server_path, request_path = tmp_path / 'server.json', tmp_path / 'request.json'
+    monkeypatch.setattr(settings, 'warm_start_path', str(server_path))
+    scheduler = scheduler_standalone.StandaloneScheduler(
+        ROOMS, [], {'verbose': False, 'random_seed': 0, 'warm_start': True, 'warm_start_path': str(request_path)}
+    )
+    results, _ = scheduler.schedule([Surgery('S1', 'D1', None, 'X', 1, 'RSU', MONDAY, 2.0, 2)])
+    assert server_path.exists()
+    assert not request_path.exists()
+    assert results[0].surgery_id == 'S1'
+
+
+def test_rescheduling_reuses_previous_rooms():
+    surgeries = [Surgery(f'S{k}', f'D{k}', None, 'X', k, 'RSU', MONDAY, 2.0, 2) for k in range(4)]
+    config = {'verbose': False, 'random_seed': 0, 'warm_start': True}
+    first, _ = scheduler_standalone.StandaloneScheduler(ROOMS, [], config).schedule(surgeries)
+
+    scheduler = scheduler_standalone.StandaloneScheduler(ROOMS, [], config)
+    second, _ = scheduler.schedule(surgeries)
+    assert scheduler.stats['warm_start']['reused'] == 4
+    assert {r.surgery_id: r.room_id for r in second} == {r.surgery_id: r.room_id for r in first}
@@ -0,0 +1,29 @@
+"""
+禁忌搜尋只在刷新最佳解時更新回傳值：最佳解的 (未截斷) 適應度不得低於初始解。
+"""
+
+import pytest
+
+from app.algorithms.TS_HSO.scheduler_standalone import StandaloneScheduler
+from app.algorithms.TS_HSO.tabu_search import run_tabu_search
+from tests.problems import make_problem
+
+
+def _raw(evaluator, genes):
+    return float(evaluator.raw_scores(evaluator.build_state(genes[None]))[0])
+
+
+@pytest.mark.parametrize('n, seed', [(40, 0), (120, 1), (120, 2)])
+def test_best_never_worse_than_initial(n, seed):
+    surgeries, rooms, doctor_schedules = make_problem(n, seed)
+    scheduler = StandaloneScheduler(
+        rooms, [], {'verbose': False, 'random_seed': seed, 'tabu_iterations': 300}, doctor_schedules
+    )
+    encoding, evaluator = scheduler._build_fitness_model(surgeries)
+    initial = encoding.encode(scheduler._constructive_heuristic(surgeries))
+
+    best_genes, best_fitness = run_tabu_search(scheduler, evaluator, initial.copy())
+
+    assert _raw(evaluator, best_genes) >= _raw(evaluator, initial)
+    assert best_fitness == pytest.approx(float(evaluator.evaluate(best_genes)[0]))
+    assert scheduler.stats['stage1']['engine'] == 'tabu'
@@ -0,0 +1,63 @@
+"""
+PopulationFitness.upper_bound 必須是真正的上界：小型實例窮舉所有分配，最佳適應度不得超過上界。
+"""
+
+import itertools
+import random
+from datetime import date
+
+import numpy as np
+import pytest
+
+from app.models.scheduling import Surgery
+from app.algorithms.TS_HSO.encoding import UNASSIGNED
+from app.algorithms.TS_HSO.scheduler_standalone import StandaloneScheduler
+
+MONDAY = date(2026, 1, 5)
+
+
+def _room(room_id, nurse_count=2, night_shift=False, room_type='RSU'):
+    return {
+        'id': room_id, 'room_type': room_type, 'nurse_count': nurse_count,
+        'morning_shift': True, 'night_shift': night_shift, 'graveyard_shift': False
+    }
+
+
+def _surgery(k, doctor_id, duration, nurse_count=2, room_type='RSU', day=MONDAY):
+    return Surgery(f'S{k}', doctor_id, None, 'X', k, room_type, day, duration, nurse_count)
+
+
+def _best_fitness(scheduler, surgeries):
+    encoding, evaluator = scheduler._build_fitness_model(surgeries)
+    genes = np.array(
+        list(itertools.product(*[c.tolist() or [UNASSIGNED] for c in encoding.candidates])), dtype=np.int64
+    )
+    return float(evaluator.evaluate(genes).max()), evaluator.upper_bound()
+
+
+def test_room_overload_cheaper_than_second_room():
+    """同一醫師 2 × 3.55h：同房超時 0.1h (-50) 比跨房 (-200) 便宜，上界不能以跨房計"""
+    scheduler = StandaloneScheduler([_room('R0'), _room('R1')], [], {'verbose': False})
+    best, bound = _best_fitness(scheduler, [_surgery(k, 'D0', 3.55) for k in range(2)])
+    assert best == pytest.approx(950.0)
+    assert best <= bound + 1e-6
+
+
+@pytest.mark.parametrize('seed', range(40))
+def test_bound_dominates_exhaustive_search(seed):
+    rnd = random.Random(seed)
+    rooms = [
+        _room(f'R{i}', rnd.choice([2, 3]), rnd.random() < 0.5, rnd.choice(['RSU', 'RSU', 'RE']))
+        for i in range(rnd.randint(2, 3))
+    ]
+    doctor_schedules = {'D0': {'monday': rnd.choice('ABC')}, 'D1': {'monday': rnd.choice('ABC')}}
+    surgeries = [
+        _surgery(
+            k, rnd.choice(['D0', 'D1', None]), rnd.choice([0.5, 1.5, 2.1, 3.55, 4, 5.5, 7.5]),
+            rnd.choice([2, 3]), rnd.choice(['RSU', 'RE'])
+        )
+        for k in range(rnd.randint(2, 6))
+    ]
+    scheduler = StandaloneScheduler(rooms, [], {'verbose': False}, doctor_schedules)
+    best, bound = _best_fitness(scheduler, surgeries)
+    assert best <= bound + 1e-6